@@ -11,6 +11,10 @@ from flask import Flask, render_template, url_for
 app = Flask(__name__)
 app.secret_key = 'kzdnfsneksnoefsdnfsdnfsinfj'
 
+# Request, AI and session metrics, served at /metrics
+from games.metrics import init_app as init_metrics
+init_metrics(app)
+
 try:
     from games.connect4 import connect4_bp
     app.register_blueprint(connect4_bp)
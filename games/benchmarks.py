@@ -0,0 +1,308 @@
+"""
+Engine Microbenchmarks
+Times the engines' hot paths on fixed, seeded position sets and compares
+the results with a stored baseline. Exits with status 1 when any benchmark
+is slower than its baseline by more than the threshold.
+
+Usage:
+    python -m games.benchmarks                      # compare with baseline
+    python -m games.benchmarks --json results.json  # also write results
+    python -m games.benchmarks --save-baseline      # record a new baseline
+    python -m games.benchmarks --only connect4.minimax
+    python -m games.benchmarks --only connect4.scaling  # board sizes
+
+Times are CPU time of this process, so other load on the machine matters
+less, but they still depend on the machine: record the baseline where the
+comparison runs.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+# A benchmark fails when it takes this much longer than the baseline
+DEFAULT_THRESHOLD = 0.25
+
+# Each benchmark runs this many passes and keeps the fastest, which is the
+# least disturbed by other work on the machine
+REPEATS = 5
+
+# Short benchmarks are looped until a pass takes at least this long
+MIN_PASS_SECONDS = 0.2
+
+# (rows, cols, k) Connect-4 variants searched by the connect4.scaling
+# benchmarks, which report nodes per second to show how search throughput
+# scales with board size and win length
+SCALING_VARIANTS = ((6, 7, 4), (7, 8, 4), (8, 9, 4), (8, 9, 5))
+SCALING_DEPTH = 5
+SCALING_POSITIONS = 5
+
+
+def connect4_positions(count: int = 200, seed: int = 0,
+                       plies: Optional[int] = None, geometry=None) -> List:
+    """
+    Random Connect-4 Positions that are not over yet, the player moving
+    first. Each has `plies` moves played (odd leaves the AI to move), or 0
+    to 30 when plies is None. geometry defaults to the standard board.
+    """
+    from .connect4.engine import PLAYER, AI
+    from .connect4.bitboard import Position, get_geometry
+    if geometry is None:
+        geometry = get_geometry()
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position, piece = Position(geometry), PLAYER
+        for _ in range(rng.randint(0, 30) if plies is None else plies):
+            position.play(rng.choice(position.valid_moves()), piece)
+            piece = AI if piece == PLAYER else PLAYER
+        if not position.is_terminal():
+            positions.append(position)
+    return positions
+
+
+def connect4_boards(count: int = 200, seed: int = 0) -> List[List[List[int]]]:
+    """connect4_positions() as the list boards the routes use."""
+    return [position.to_board() for position in connect4_positions(count, seed)]
+
+
+def tic_tac_toe_engines(count: int = 50, seed: int = 0) -> List:
+    """Unfinished tic-tac-toe games with 0 to 5 moves played."""
+    from .tic_tac_toe.engine import TicTacToeEngine
+    rng = random.Random(seed)
+    engines = []
+    while len(engines) < count:
+        engine = TicTacToeEngine()
+        for _ in range(rng.randint(0, 5)):
+            row, col = rng.choice(engine.get_available_moves())
+            engine.make_move(row, col)
+        if not engine.game_over:
+            engines.append(engine)
+    return engines
+
+
+def _time_calls(fn: Callable, args_list: List[tuple]) -> float:
+    start = time.process_time()
+    for args in args_list:
+        fn(*args)
+    return time.process_time() - start
+
+
+def _connect4_benchmarks(seed: int) -> Dict[str, Callable[[], tuple]]:
+    from .connect4.engine import (
+        PLAYER, AI, winning_move, score_position, get_valid_locations
+    )
+    from .connect4.bitboard import get_geometry
+    from .connect4.minimax import DEPTH_MAP, minimax
+    from .connect4.ordering import MoveOrderer
+    from .connect4.transposition import TranspositionTable
+    from .search_stats import SearchStats
+
+    boards = connect4_boards(seed=seed)
+    both_sides = [(board, piece) for board in boards for piece in (PLAYER, AI)]
+    benchmarks = {
+        'connect4.winning_move':
+            lambda: (_time_calls(winning_move, both_sides), len(both_sides)),
+        'connect4.score_position':
+            lambda: (_time_calls(score_position, both_sides), len(both_sides)),
+        'connect4.get_valid_locations':
+            lambda: (_time_calls(get_valid_locations, [(b,) for b in boards]),
+                     len(boards)),
+    }
+
+    # The first ten of the same sample as boards
+    search_positions = connect4_positions(10, seed)
+
+    def search(positions, depth, count_nodes=False):
+        tables = [TranspositionTable() for _ in positions]
+        stats = SearchStats() if count_nodes else None
+        start = time.process_time()
+        for position, table in zip(positions, tables):
+            orderer = MoveOrderer(position.geometry)
+            orderer.new_search(position)
+            if stats is not None:
+                stats.root_ply = position.moves
+            minimax(position, depth, -math.inf, math.inf, True, table,
+                    orderer=orderer, stats=stats)
+        elapsed = time.process_time() - start
+        if stats is None:
+            return elapsed, len(positions)
+        return elapsed, len(positions), stats.nodes
+
+    for difficulty, depth in DEPTH_MAP.items():
+        benchmarks[f'connect4.minimax.{difficulty}'] = (
+            lambda depth=depth: search(search_positions, depth))
+
+    # One op is one search; these also count nodes, so their us/op includes
+    # the counting and is not comparable with connect4.minimax.*
+    for rows, cols, k in SCALING_VARIANTS:
+        positions = connect4_positions(SCALING_POSITIONS, seed, plies=7,
+                                       geometry=get_geometry(rows, cols, k))
+        benchmarks[f'connect4.scaling.{rows}x{cols}k{k}'] = (
+            lambda positions=positions: search(positions, SCALING_DEPTH, True))
+    return benchmarks
+
+
+def _tic_tac_toe_benchmarks(seed: int) -> Dict[str, Callable[[], tuple]]:
+    from .tic_tac_toe.minimax import MinimaxAI
+
+    engines = tic_tac_toe_engines(seed=seed)
+    benchmarks = {
+        'tic_tac_toe.copy':
+            lambda: (_time_calls(lambda e: e.copy(), [(e,) for e in engines]),
+                     len(engines)),
+    }
+
+    def best_moves(difficulty):
+        ai = MinimaxAI(difficulty)
+        # Same random moves on every pass
+        random.seed(seed)
+        elapsed = _time_calls(
+            ai.get_best_move,
+            [(engine, engine.current_player) for engine in engines])
+        return elapsed, len(engines)
+
+    for difficulty in ('easy', 'medium', 'hard'):
+        benchmarks[f'tic_tac_toe.get_best_move.{difficulty}'] = (
+            lambda difficulty=difficulty: best_moves(difficulty))
+    return benchmarks
+
+
+def _timed_pass(bench: Callable[[], tuple]) -> tuple:
+    """
+    (seconds, ops, nodes) over enough runs of bench to fill a pass. A bench
+    returns (seconds, ops), or (seconds, ops, nodes) if it counts search
+    nodes; nodes is None for the others.
+    """
+    seconds, ops, nodes = 0.0, 0, None
+    while seconds < MIN_PASS_SECONDS:
+        elapsed, count, *counted = bench()
+        seconds += elapsed
+        ops += count
+        if counted:
+            nodes = (nodes or 0) + counted[0]
+    return seconds, ops, nodes
+
+
+def run_benchmarks(only: Optional[str] = None, seed: int = 0,
+                   repeats: int = REPEATS) -> Dict:
+    """Run every benchmark whose name contains `only`; returns the results document."""
+    benchmarks = {}
+    benchmarks.update(_connect4_benchmarks(seed))
+    benchmarks.update(_tic_tac_toe_benchmarks(seed))
+
+    results = {}
+    for name, bench in benchmarks.items():
+        if only and only not in name:
+            continue
+        passes = [_timed_pass(bench) for _ in range(repeats)]
+        seconds, ops, nodes = min(passes, key=lambda p: p[0] / p[1])
+        results[name] = {
+            'ops': ops,
+            'seconds': seconds,
+            'us_per_op': 1e6 * seconds / ops,
+        }
+        if nodes is not None:
+            results[name]['nodes'] = nodes
+            results[name]['nodes_per_second'] = nodes / seconds if seconds else 0.0
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'seed': seed,
+            'repeats': repeats,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict,
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare per-op times with the baseline. A benchmark regresses when its
+    ratio (current / baseline) exceeds 1 + threshold. Benchmarks missing from
+    the baseline are reported with ratio None and never fail.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        ratio = result['us_per_op'] / base['us_per_op'] if base else None
+        rows.append({
+            'name': name,
+            'us_per_op': result['us_per_op'],
+            'baseline_us_per_op': base['us_per_op'] if base else None,
+            'ratio': ratio,
+            'regressed': ratio is not None and ratio > 1 + threshold,
+            'nodes_per_second': result.get('nodes_per_second'),
+        })
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown as a fraction (default 0.25)')
+    parser.add_argument('--only', help='run benchmarks whose name contains this')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--json', metavar='PATH',
+                        help="write results to PATH ('-' for stdout)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.only, args.seed, args.repeats)
+    if args.json == '-':
+        json.dump(current, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}', file=sys.stderr)
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+        print(f'No baseline at {args.baseline}', file=sys.stderr)
+
+    rows = compare(current, baseline, args.threshold)
+    out = sys.stderr if args.json == '-' else sys.stdout
+    print(f'{"benchmark":<36} {"us/op":>10} {"baseline":>10} {"ratio":>6} '
+          f'{"nodes/s":>9}', file=out)
+    for row in rows:
+        base = row['baseline_us_per_op']
+        ratio = row['ratio']
+        nps = row['nodes_per_second']
+        print(f'{row["name"]:<36} {row["us_per_op"]:>10.2f} '
+              f'{"-" if base is None else format(base, ".2f"):>10} '
+              f'{"-" if ratio is None else format(ratio, ".2f"):>6} '
+              f'{"-" if nps is None else format(nps, ".0f"):>9}'
+              f'{"  REGRESSED" if row["regressed"] else ""}', file=out)
+
+    regressed = [row['name'] for row in rows if row['regressed']]
+    if regressed:
+        print(f'{len(regressed)} benchmark(s) slower than baseline by more than '
+              f'{args.threshold:.0%}: {", ".join(regressed)}', file=out)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Connect-4 Position Analysis
+Scores every legal column for the side to move and extracts the principal
+variation. Searches run against the difficulty's shared transposition table,
+which already holds the AI's last search and the pondered replies, so most
+columns are answered straight from the table.
+"""
+import math
+
+from .engine import CONNECT, PLAYER, AI
+from .bitboard import Position
+from .cache import SearchCache, get_search_cache
+from .minimax import (
+    DEPTH_MAP, WIN_SCORE, LOSS_SCORE, get_table, known_difficulty, minimax,
+    principal_variation
+)
+from .ordering import MoveOrderer
+
+def analyze_position(board, side, difficulty='medium', cache=None, k=CONNECT):
+    """
+    Analyse a list board with `side` (PLAYER or AI) to move.
+
+    Returns a dict with a score per legal column (from side's point of view,
+    higher is better), the best column, the principal variation starting
+    with that column, and the search depth.
+    """
+    difficulty = known_difficulty(difficulty)
+    if cache is None:
+        cache = get_search_cache()
+    position = Position.from_board(board, k)
+    if cache:
+        # Stored for the canonical side of the position's mirror pair
+        position_key, mirrored = position.canonical_key()
+        key = SearchCache.make_key(position_key, side, difficulty, 'analysis',
+                                   position.geometry.variant)
+        cached = cache.get(key)
+        if cached is not None:
+            if mirrored:
+                cached = _mirror_analysis(position.geometry, cached)
+            return dict(cached, cached=True)
+
+    depth = DEPTH_MAP[difficulty]
+    table = get_table(difficulty, position.geometry.variant)
+    orderer = MoveOrderer(position.geometry)
+    orderer.new_search(position)
+    # Search values are from the AI's side
+    sign = 1 if side == AI else -1
+    reply_maximizing = side == PLAYER
+
+    scores = {}
+    for col in position.valid_moves():
+        position.play(col, side)
+        if position.is_win(side):
+            value = WIN_SCORE if side == AI else LOSS_SCORE
+        else:
+            _, value = minimax(position, depth - 1, -math.inf, math.inf,
+                               reply_maximizing, table, orderer=orderer)
+        position.undo(col)
+        scores[col] = sign * value
+
+    best_column = None
+    for col in position.geometry.center_order:
+        if col in scores and (best_column is None or scores[col] > scores[best_column]):
+            best_column = col
+
+    pv = []
+    if best_column is not None:
+        position.play(best_column, side)
+        pv = [best_column] + principal_variation(position, reply_maximizing,
+                                                 table, depth - 1)
+        position.undo(best_column)
+
+    result = {
+        'columns': [{'column': col, 'score': score}
+                    for col, score in sorted(scores.items())],
+        'best_column': best_column,
+        'principal_variation': pv,
+        'depth': depth,
+    }
+    if cache:
+        cache.put(key, _mirror_analysis(position.geometry, result) if mirrored else result)
+    return result
+
+def _mirror_analysis(geometry, result):
+    """The analysis of the position's mirror image."""
+    mirror = geometry.mirror_col
+    return dict(
+        result,
+        columns=sorted(({'column': mirror(c['column']), 'score': c['score']}
+                        for c in result['columns']), key=lambda c: c['column']),
+        best_column=None if result['best_column'] is None else mirror(result['best_column']),
+        principal_variation=[mirror(col) for col in result['principal_variation']],
+    )
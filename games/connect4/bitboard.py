@@ -0,0 +1,333 @@
+"""
+Connect-4 Bitboard Position
+Search-side board representation. Each column takes rows + 1 bits (the
+extra bit is an always-empty sentinel), so k-in-a-row can be found with a
+few shifts and masks instead of scanning every window of a list board.
+
+Board size and win length live in a Geometry, which also holds the window
+and hashing tables for that size. The module-level constants describe the
+standard 6x7 connect-4 board.
+"""
+import random
+
+from .engine import ROWS, COLS, CONNECT, EMPTY, PLAYER, AI, evaluate_window
+
+CENTER_BONUS = 3
+
+_zobrist_rng = random.Random(0xC0417)
+_standard_zobrist = [
+    [_zobrist_rng.getrandbits(64) for _ in range(COLS * (ROWS + 1))]
+    for _ in range(3)
+]
+# Mixed into the key when the maximizing side (the AI) is to move
+SIDE_KEY = _zobrist_rng.getrandbits(64)
+
+
+def has_run(mask, directions, k):
+    """True if the bitmask contains k in a row along any of the shifts."""
+    for shift in directions:
+        # Double the run length while it fits, then overlap two runs
+        m = mask
+        length = 1
+        while length * 2 <= k:
+            m &= m >> (shift * length)
+            length *= 2
+        if length < k:
+            m &= m >> (shift * (k - length))
+        if m:
+            return True
+    return False
+
+
+class Geometry:
+    """
+    Board size and win length of a game variant, plus the bitboard tables
+    derived from them. Use get_geometry() so the tables are built once per
+    variant.
+    """
+
+    def __init__(self, rows=ROWS, cols=COLS, k=CONNECT):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.size = rows * cols
+        # None for the standard board; otherwise a tag such as '7x8k4' that
+        # keeps cache keys of different variants apart
+        self.variant = (None if (rows, cols, k) == (ROWS, COLS, CONNECT)
+                        else f'{rows}x{cols}k{k}')
+
+        # Bits per column, including the sentinel bit on top
+        self.h1 = h1 = rows + 1
+        # Shift distances for vertical, horizontal and the two diagonals
+        self.directions = (1, h1, h1 - 1, h1 + 1)
+        # Lowest cell of every column
+        self.bottom_mask = sum(1 << (c * h1) for c in range(cols))
+        self.board_mask = self.bottom_mask * ((1 << rows) - 1)
+
+        self.center_col = cols // 2
+        # Center columns take part in the most windows, so try them first
+        self.center_order = tuple(sorted(range(cols),
+                                         key=lambda c: abs(c - cols // 2)))
+
+        # Every k-cell window on the board, as a bitmask
+        self.windows = self._build_windows()
+        # Window ids passing through each cell, indexed by bit index
+        self.cell_windows = tuple(
+            tuple(w for w, mask in enumerate(self.windows) if mask >> index & 1)
+            for index in range(cols * h1)
+        )
+        # A window's contents are encoded as player_count * (k + 1) +
+        # ai_count, so adding a piece to a window is one integer addition
+        self.code_step = (0, k + 1, 1)
+        # evaluate_window results for every window code, from each side
+        self.window_scores = (None, self._build_window_scores(PLAYER),
+                              self._build_window_scores(AI))
+
+        # Zobrist keys, indexed by piece and then by bit index. Seeded so
+        # that hashes are stable across processes and restarts.
+        if self.variant is None:
+            self.zobrist = _standard_zobrist
+        else:
+            rng = random.Random(f'zobrist:{rows}x{cols}k{k}')
+            self.zobrist = [[rng.getrandbits(64) for _ in range(cols * h1)]
+                            for _ in range(3)]
+
+    def bit(self, row, col):
+        """Bit for a cell, with row 0 being the bottom of the column."""
+        return 1 << (col * self.h1 + row)
+
+    def mirror_col(self, col):
+        """The column col lands on when the board is mirrored left to right."""
+        return self.cols - 1 - col
+
+    def mirror_key(self, key):
+        """
+        Key of the left-right mirror image of the position with this key.
+        Each column is a self-contained block of h1 bits in Position.key(),
+        so mirroring reverses the order of the blocks.
+        """
+        h1, column = self.h1, (1 << self.h1) - 1
+        mirrored = 0
+        for _ in range(self.cols):
+            mirrored = (mirrored << h1) | (key & column)
+            key >>= h1
+        return mirrored
+
+    def has_win(self, mask):
+        if self.k == 4:
+            return has_four(mask, self.directions)
+        return has_run(mask, self.directions, self.k)
+
+    def _build_windows(self):
+        rows, cols, k, bit = self.rows, self.cols, self.k, self.bit
+        windows = []
+        # Horizontal
+        for r in range(rows):
+            for c in range(cols - k + 1):
+                windows.append(sum(bit(r, c + i) for i in range(k)))
+        # Vertical
+        for c in range(cols):
+            for r in range(rows - k + 1):
+                windows.append(sum(bit(r + i, c) for i in range(k)))
+        # Positively sloped diagonals
+        for r in range(rows - k + 1):
+            for c in range(cols - k + 1):
+                windows.append(sum(bit(r + i, c + i) for i in range(k)))
+        # Negatively sloped diagonals
+        for r in range(k - 1, rows):
+            for c in range(cols - k + 1):
+                windows.append(sum(bit(r - i, c + i) for i in range(k)))
+        return tuple(windows)
+
+    def _build_window_scores(self, piece):
+        k = self.k
+        opp = PLAYER if piece == AI else AI
+        scores = [0] * ((k + 1) * (k + 1))
+        for player_count in range(k + 1):
+            for ai_count in range(k + 1 - player_count):
+                counts = {PLAYER: player_count, AI: ai_count}
+                window = ([piece] * counts[piece] + [opp] * counts[opp] +
+                          [EMPTY] * (k - player_count - ai_count))
+                scores[player_count * (k + 1) + ai_count] = evaluate_window(window, piece)
+        return tuple(scores)
+
+
+_geometries = {}
+
+def get_geometry(rows=ROWS, cols=COLS, k=CONNECT):
+    geometry = _geometries.get((rows, cols, k))
+    if geometry is None:
+        if not 1 <= k <= max(rows, cols):
+            raise ValueError(f'Cannot connect {k} on a {rows}x{cols} board')
+        geometry = _geometries.setdefault((rows, cols, k),
+                                          Geometry(rows, cols, k))
+    return geometry
+
+
+STANDARD = get_geometry()
+
+# Tables of the standard board, for code that only plays that size
+H1 = STANDARD.h1
+DIRECTIONS = STANDARD.directions
+BOTTOM_MASK = STANDARD.bottom_mask
+WINDOWS = STANDARD.windows
+CELL_WINDOWS = STANDARD.cell_windows
+CODE_STEP = STANDARD.code_step
+WINDOW_SCORES = STANDARD.window_scores
+ZOBRIST = STANDARD.zobrist
+
+
+def bit(row, col):
+    """Bit for a cell of the standard board, with row 0 at the bottom."""
+    return 1 << (col * H1 + row)
+
+
+def has_four(mask, directions=DIRECTIONS):
+    """True if the bitmask contains four in a row; the common case of has_run."""
+    for shift in directions:
+        m = mask & (mask >> shift)
+        if m & (m >> (2 * shift)):
+            return True
+    return False
+
+
+class Position:
+    """Connect-k position stored as one bitmask per piece plus column heights."""
+
+    __slots__ = ('geometry', 'pieces', 'heights', 'moves', 'hash',
+                 'window_codes', 'evals')
+
+    def __init__(self, geometry=STANDARD):
+        self.geometry = geometry
+        # Indexed by piece value; the EMPTY slot is unused
+        self.pieces = [0, 0, 0]
+        self.heights = [0] * geometry.cols
+        self.moves = 0
+        # Zobrist hash of the pieces, updated incrementally by play()
+        self.hash = 0
+        # Code of every window and the heuristic score from each piece's
+        # side, both updated incrementally by play()
+        self.window_codes = [0] * len(geometry.windows)
+        self.evals = [0, 0, 0]
+
+    @classmethod
+    def from_board(cls, board, k=CONNECT):
+        """Build a position from the list-of-lists board used by the routes."""
+        rows, cols = len(board), len(board[0])
+        position = cls(get_geometry(rows, cols, k))
+        for c in range(cols):
+            for r in range(rows - 1, -1, -1):
+                piece = board[r][c]
+                if piece == EMPTY:
+                    break
+                position.play(c, piece)
+        return position
+
+    def to_board(self):
+        g = self.geometry
+        board = [[EMPTY for _ in range(g.cols)] for _ in range(g.rows)]
+        for c in range(g.cols):
+            for h in range(self.heights[c]):
+                b = g.bit(h, c)
+                board[g.rows - 1 - h][c] = PLAYER if self.pieces[PLAYER] & b else AI
+        return board
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.geometry = self.geometry
+        position.pieces = self.pieces[:]
+        position.heights = self.heights[:]
+        position.moves = self.moves
+        position.hash = self.hash
+        position.window_codes = self.window_codes[:]
+        position.evals = self.evals[:]
+        return position
+
+    def can_play(self, col):
+        return 0 <= col < self.geometry.cols and self.heights[col] < self.geometry.rows
+
+    def valid_moves(self):
+        heights = self.heights
+        rows = self.geometry.rows
+        return [c for c in range(self.geometry.cols) if heights[c] < rows]
+
+    def play(self, col, piece):
+        """
+        Drop a piece in a column, in place. Returns the list-board row it
+        landed on. Search code pairs every play() with an undo() instead of
+        copying the position.
+        """
+        g = self.geometry
+        h = self.heights[col]
+        index = col * g.h1 + h
+        self.pieces[piece] |= 1 << index
+        self.hash ^= g.zobrist[piece][index]
+        self.heights[col] = h + 1
+        self.moves += 1
+        self._update_evals(g, index, col, piece, 1)
+        return g.rows - 1 - h
+
+    def undo(self, col):
+        """Take back the top piece of a column, reversing play()."""
+        g = self.geometry
+        h = self.heights[col] - 1
+        index = col * g.h1 + h
+        piece = AI if self.pieces[AI] >> index & 1 else PLAYER
+        self.pieces[piece] ^= 1 << index
+        self.hash ^= g.zobrist[piece][index]
+        self.heights[col] = h
+        self.moves -= 1
+        self._update_evals(g, index, col, piece, -1)
+
+    def _update_evals(self, g, index, col, piece, sign):
+        """Rescore only the windows through one cell after adding (sign=1)
+        or removing (sign=-1) a piece there."""
+        codes = self.window_codes
+        evals = self.evals
+        player_scores, ai_scores = g.window_scores[PLAYER], g.window_scores[AI]
+        step = g.code_step[piece] * sign
+        player_eval = evals[PLAYER]
+        ai_eval = evals[AI]
+        for w in g.cell_windows[index]:
+            old = codes[w]
+            new = old + step
+            codes[w] = new
+            player_eval += player_scores[new] - player_scores[old]
+            ai_eval += ai_scores[new] - ai_scores[old]
+        evals[PLAYER] = player_eval
+        evals[AI] = ai_eval
+        if col == g.center_col:
+            evals[piece] += CENTER_BONUS * sign
+
+    def is_win(self, piece):
+        return self.geometry.has_win(self.pieces[piece])
+
+    def key(self):
+        """
+        Collision-free integer key for the position: the AI's pieces plus the
+        occupancy mask shifted up by one cell per column. Fits in
+        cols * (rows + 1) bits.
+        """
+        mask = self.pieces[PLAYER] | self.pieces[AI]
+        return self.pieces[AI] + mask + self.geometry.bottom_mask
+
+    def canonical_key(self):
+        """
+        (key, mirrored): the smaller of key() and its mirror image's key,
+        and whether that is the mirror image's. A position and its mirror
+        image share a canonical key; when mirrored is True, columns found
+        for the key map back through geometry.mirror_col().
+        """
+        key = self.key()
+        mirror = self.geometry.mirror_key(key)
+        return (mirror, True) if mirror < key else (key, False)
+
+    def is_full(self):
+        return self.moves == self.geometry.size
+
+    def is_terminal(self):
+        return self.is_win(PLAYER) or self.is_win(AI) or self.is_full()
+
+    def score(self, piece):
+        """Heuristic score, identical to engine.score_position on the same board."""
+        return self.evals[piece]
@@ -0,0 +1,92 @@
+"""
+Connect-4 Opening Book
+Read-only lookup of precomputed AI moves for early positions. The book file
+is memory-mapped, so every worker process shares one page-cached copy and
+nothing is parsed at load time.
+
+File layout (little-endian):
+    header: 8-byte magic, uint32 plies, uint32 entry count
+    entries: uint64 each, (key << 3) | column, sorted ascending
+
+Current books key entries on Position.canonical_key(), so a position and
+its mirror image share one entry whose column is for the canonical side.
+Books with the older magic hold plain Position.key() entries and are still
+read.
+"""
+import mmap
+import os
+import struct
+
+MAGIC = b'C4BOOK2\0'
+# Books keyed on Position.key(), before canonical keys
+PLAIN_MAGIC = b'C4BOOK1\0'
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<Q')
+MOVE_BITS = 3
+MOVE_MASK = (1 << MOVE_BITS) - 1
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'data', 'opening_book.bin')
+
+
+class OpeningBook:
+    """Binary search over a memory-mapped, sorted book file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.plies, self.count = HEADER.unpack_from(self.data, 0)
+        if magic not in (MAGIC, PLAIN_MAGIC):
+            self.data.close()
+            raise ValueError(f'{path} is not a Connect-4 opening book')
+        self.canonical = magic == MAGIC
+
+    def lookup(self, position):
+        """Return the book column for the position (AI to move), or None."""
+        if position.moves > self.plies:
+            return None
+        if self.canonical:
+            key, mirrored = position.canonical_key()
+        else:
+            key, mirrored = position.key(), False
+        data = self.data
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = ENTRY.unpack_from(data, HEADER.size + mid * ENTRY.size)[0]
+            entry_key = entry >> MOVE_BITS
+            if entry_key < key:
+                lo = mid + 1
+            elif entry_key > key:
+                hi = mid
+            else:
+                col = entry & MOVE_MASK
+                return position.geometry.mirror_col(col) if mirrored else col
+        return None
+
+    def close(self):
+        self.data.close()
+
+
+def write_book(path, plies, moves):
+    """
+    Write a book file from a {canonical_key: column} mapping, with columns
+    for the canonical side (see Position.canonical_key).
+    """
+    entries = sorted((key << MOVE_BITS) | col for key, col in moves.items())
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, plies, len(entries)))
+        for entry in entries:
+            f.write(ENTRY.pack(entry))
+
+
+# Books opened so far, by path. None records a missing file.
+_books = {}
+
+def get_opening_book(path=DEFAULT_BOOK_PATH):
+    """The process-wide book for a path, or None if the file does not exist."""
+    if path not in _books:
+        _books[path] = OpeningBook(path) if os.path.exists(path) else None
+    return _books[path]
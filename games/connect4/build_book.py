@@ -0,0 +1,74 @@
+"""
+Connect-4 Opening Book Builder
+Offline tool that searches every position the AI can face in the first few
+plies and writes the best moves to a book file.
+
+Usage:
+    python -m games.connect4.build_book --plies 4 --depth 9
+"""
+import argparse
+import math
+import time
+
+from .engine import PLAYER, AI
+from .bitboard import Position
+from .book import DEFAULT_BOOK_PATH, write_book
+from .minimax import minimax
+from .ordering import MoveOrderer
+from .transposition import TranspositionTable
+
+def book_positions(plies):
+    """Every non-terminal position with at most `plies` pieces where the AI
+    is to move, whichever side started. Of a position and its mirror image
+    only one is returned."""
+    found = {}
+
+    def walk(position, to_move):
+        if position.is_win(PLAYER) or position.is_win(AI) or position.is_full():
+            return
+        if to_move == AI:
+            found.setdefault(position.canonical_key()[0], position.copy())
+        if position.moves == plies:
+            return
+        for col in position.valid_moves():
+            position.play(col, to_move)
+            walk(position, PLAYER if to_move == AI else AI)
+            position.undo(col)
+
+    walk(Position(), AI)
+    walk(Position(), PLAYER)
+    return list(found.values())
+
+def build_book(plies, depth, path=DEFAULT_BOOK_PATH, verbose=True):
+    positions = book_positions(plies)
+    table = TranspositionTable(1 << 20)
+    moves = {}
+    start = time.monotonic()
+    for i, position in enumerate(positions, 1):
+        table.new_search()
+        orderer = MoveOrderer()
+        orderer.new_search(position)
+        col, _ = minimax(position, depth, -math.inf, math.inf, True, table,
+                         orderer=orderer)
+        key, mirrored = position.canonical_key()
+        moves[key] = position.geometry.mirror_col(col) if mirrored else col
+        if verbose and i % 50 == 0:
+            print(f'{i}/{len(positions)} positions, '
+                  f'{time.monotonic() - start:.1f}s')
+    write_book(path, plies, moves)
+    if verbose:
+        print(f'Wrote {len(moves)} entries to {path}')
+    return moves
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--plies', type=int, default=4,
+                        help='book covers positions with at most this many pieces')
+    parser.add_argument('--depth', type=int, default=9,
+                        help='search depth for every book position')
+    parser.add_argument('--output', default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+    build_book(args.plies, args.depth, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Connect-4 Search Result Cache
+Process-wide cache of get_best_move results keyed by canonical position
+(a position and its mirror image share an entry), side to move, difficulty
+and search budget, shared by every request in a worker. Storage
+is pluggable: the in-memory LRU backend serves one process, the SQLite
+backend lets several worker processes share results through a local file.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """Thread-safe LRU dictionary capped at max_entries."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store a value. Returns the number of entries evicted."""
+        evicted = 0
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SqliteBackend:
+    """
+    LRU cache in a SQLite file, shareable between worker processes.
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS search_cache ('
+                         'key TEXT PRIMARY KEY, value TEXT, last_used REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS search_cache_last_used '
+                         'ON search_cache (last_used)')
+
+    def _connection(self):
+        # sqlite3 connections may not be shared between threads
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT value FROM search_cache WHERE key = ?',
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute('UPDATE search_cache SET last_used = ? WHERE key = ?',
+                         (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        conn = self._connection()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?)',
+                         (key, json.dumps(value), time.time()))
+            count = conn.execute('SELECT COUNT(*) FROM search_cache').fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute('DELETE FROM search_cache WHERE key IN ('
+                             'SELECT key FROM search_cache '
+                             'ORDER BY last_used LIMIT ?)', (excess,))
+                return excess
+        return 0
+
+    def __len__(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM search_cache').fetchone()[0]
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM search_cache')
+
+
+class SearchCache:
+    """Counts hits, misses and evictions on top of a storage backend."""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(position_key, side, difficulty, budget, variant=None):
+        """variant is Geometry.variant, None for the standard board."""
+        key = f'{position_key}:{side}:{difficulty}:{budget}'
+        return key if variant is None else f'{variant}:{key}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        evicted = self.backend.put(key, value)
+        if evicted:
+            with self.lock:
+                self.evictions += evicted
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'entries': len(self.backend),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+
+_search_cache = SearchCache()
+
+def get_search_cache():
+    return _search_cache
+
+def set_search_cache(cache):
+    """Swap the process-wide cache, e.g. for one on a SqliteBackend."""
+    global _search_cache
+    _search_cache = cache
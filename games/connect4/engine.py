@@ -1,20 +1,24 @@
 """
 Connect-4 Game Engine
+Boards are lists of rows, top row first. ROWS, COLS and CONNECT describe the
+standard game; other sizes are played by creating a board of that size and
+passing the win length k wherever it matters.
 """
 ROWS = 6
 COLS = 7
+CONNECT = 4
 EMPTY = 0
 PLAYER = 1
 AI = 2
 
-def create_board():
-    return [[EMPTY for _ in range(COLS)] for _ in range(ROWS)]
+def create_board(rows=ROWS, cols=COLS):
+    return [[EMPTY for _ in range(cols)] for _ in range(rows)]
 
 def is_valid_location(board, col):
-    return 0 <= col < COLS and board[0][col] == EMPTY
+    return 0 <= col < len(board[0]) and board[0][col] == EMPTY
 
 def get_next_open_row(board, col):
-    for r in range(ROWS - 1, -1, -1):
+    for r in range(len(board) - 1, -1, -1):
         if board[r][col] == EMPTY:
             return r
     return -1
@@ -24,101 +28,109 @@ def drop_piece(board, row, col, piece):
 
 def get_valid_locations(board):
     valid_locations = []
-    for col in range(COLS):
+    for col in range(len(board[0])):
         if is_valid_location(board, col):
             valid_locations.append(col)
     return valid_locations
 
-def winning_move(board, piece):
+def _run_from(board, r, c, dr, dc, piece, k):
+    """True if the k cells stepping (dr, dc) from board[r][c] all hold piece."""
+    for i in range(1, k):
+        if board[r + dr*i][c + dc*i] != piece:
+            return False
+    return True
+
+def winning_move(board, piece, k=CONNECT):
+    rows, cols = len(board), len(board[0])
+
     # Check horizontal wins
-    for c in range(COLS - 3):
-        for r in range(ROWS):
-            if (board[r][c] == piece and board[r][c+1] == piece and 
-                board[r][c+2] == piece and board[r][c+3] == piece):
+    for c in range(cols - k + 1):
+        for r in range(rows):
+            if board[r][c] == piece and _run_from(board, r, c, 0, 1, piece, k):
                 return True
 
     # Check vertical wins
-    for c in range(COLS):
-        for r in range(ROWS - 3):
-            if (board[r][c] == piece and board[r+1][c] == piece and 
-                board[r+2][c] == piece and board[r+3][c] == piece):
+    for c in range(cols):
+        for r in range(rows - k + 1):
+            if board[r][c] == piece and _run_from(board, r, c, 1, 0, piece, k):
                 return True
 
     # Check positively sloped diagonals
-    for c in range(COLS - 3):
-        for r in range(ROWS - 3):
-            if (board[r][c] == piece and board[r+1][c+1] == piece and 
-                board[r+2][c+2] == piece and board[r+3][c+3] == piece):
+    for c in range(cols - k + 1):
+        for r in range(rows - k + 1):
+            if board[r][c] == piece and _run_from(board, r, c, 1, 1, piece, k):
                 return True
 
     # Check negatively sloped diagonals
-    for c in range(COLS - 3):
-        for r in range(3, ROWS):
-            if (board[r][c] == piece and board[r-1][c+1] == piece and 
-                board[r-2][c+2] == piece and board[r-3][c+3] == piece):
+    for c in range(cols - k + 1):
+        for r in range(k - 1, rows):
+            if board[r][c] == piece and _run_from(board, r, c, -1, 1, piece, k):
                 return True
 
     return False
 
-def is_terminal_node(board):
-    return (winning_move(board, PLAYER) or 
-            winning_move(board, AI) or 
+def is_terminal_node(board, k=CONNECT):
+    return (winning_move(board, PLAYER, k) or 
+            winning_move(board, AI, k) or 
             len(get_valid_locations(board)) == 0)
 
 def evaluate_window(window, piece):
+    """Score one k-cell window; k is the window's length."""
     score = 0
     opp_piece = PLAYER if piece == AI else AI
+    k = len(window)
     
     piece_count = window.count(piece)
     empty_count = window.count(EMPTY)
     opp_count = window.count(opp_piece)
     
-    if piece_count == 4:
+    if piece_count == k:
         score += 100
-    elif piece_count == 3 and empty_count == 1:
+    elif piece_count == k - 1 and empty_count == 1:
         score += 10
-    elif piece_count == 2 and empty_count == 2:
+    elif piece_count == k - 2 and empty_count == 2:
         score += 2
         
-    if opp_count == 3 and empty_count == 1:
+    if opp_count == k - 1 and empty_count == 1:
         score -= 80
-    elif opp_count == 2 and empty_count == 2:
+    elif opp_count == k - 2 and empty_count == 2:
         score -= 3
         
     return score
 
-def score_position(board, piece):
+def score_position(board, piece, k=CONNECT):
     score = 0
+    rows, cols = len(board), len(board[0])
     
     # Favor center column
-    center_array = [board[i][COLS//2] for i in range(ROWS)]
+    center_array = [board[i][cols//2] for i in range(rows)]
     center_count = center_array.count(piece)
     score += center_count * 3
     
     # Score horizontal positions
-    for r in range(ROWS):
+    for r in range(rows):
         row_array = board[r]
-        for c in range(COLS - 3):
-            window = row_array[c:c+4]
+        for c in range(cols - k + 1):
+            window = row_array[c:c+k]
             score += evaluate_window(window, piece)
     
     # Score vertical positions
-    for c in range(COLS):
-        col_array = [board[i][c] for i in range(ROWS)]
-        for r in range(ROWS - 3):
-            window = col_array[r:r+4]
+    for c in range(cols):
+        col_array = [board[i][c] for i in range(rows)]
+        for r in range(rows - k + 1):
+            window = col_array[r:r+k]
             score += evaluate_window(window, piece)
     
     # Score positive diagonal positions
-    for r in range(ROWS - 3):
-        for c in range(COLS - 3):
-            window = [board[r+i][c+i] for i in range(4)]
+    for r in range(rows - k + 1):
+        for c in range(cols - k + 1):
+            window = [board[r+i][c+i] for i in range(k)]
             score += evaluate_window(window, piece)
     
     # Score negative diagonal positions
-    for r in range(ROWS - 3):
-        for c in range(COLS - 3):
-            window = [board[r+3-i][c+i] for i in range(4)]
+    for r in range(rows - k + 1):
+        for c in range(cols - k + 1):
+            window = [board[r+k-1-i][c+i] for i in range(k)]
             score += evaluate_window(window, piece)
     
     return score
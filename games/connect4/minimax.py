@@ -1,82 +1,461 @@
 """
 Connect-4 Minimax Algorithm with Alpha-Beta Pruning
+Searches on bitboard positions; list boards are converted at the edge.
 """
 import math
 import random
+import threading
+import time
+from collections import OrderedDict
 from .engine import *
+from ..metrics import ai_search
+from .bitboard import Position, SIDE_KEY
+from .book import get_opening_book
+from .cache import SearchCache, get_search_cache
+from .ordering import MoveOrderer
+from .solver import solve_best_move
+from .tactics import tactical_moves
+from .transposition import (
+    TranspositionTable, EXACT, LOWER, UPPER, DEPTH, FLAG, VALUE, MOVE
+)
+
+DEPTH_MAP = {
+    'easy': 2,
+    'medium': 4,
+    'hard': 6
+}
+
+def known_difficulty(difficulty):
+    """
+    difficulty if it is one of DEPTH_MAP's levels, else 'medium'. Tables and
+    counters are kept per difficulty, so anything taken from a request goes
+    through this first.
+    """
+    return difficulty if isinstance(difficulty, str) and difficulty in DEPTH_MAP else 'medium'
+
+# Default per-move wall-clock budgets in seconds. Difficulties listed here
+# use iterative deepening instead of a single fixed-depth search.
+TIME_BUDGETS = {
+    'hard': 1.0
+}
+
+# Longest budget a request may ask for; hard deepens until the budget runs
+# out, so this is what bounds a move's search time
+MAX_TIME_BUDGET = 5.0
+
+# Difficulties that play from the opening book when the position is in it
+BOOK_DIFFICULTIES = ('hard',)
+
+# Difficulties that split the root moves across the process pool in
+# games.connect4.parallel. Empty by default; add 'hard' to opt in.
+PARALLEL_DIFFICULTIES = ()
+
+# Empty-cell thresholds at or below which a difficulty stops using the
+# heuristic search and solves the position exactly
+ENDGAME_THRESHOLDS = {
+    'hard': 14
+}
+
+WIN_SCORE = 100000000000000
+LOSS_SCORE = -10000000000000
+
+class SearchTimeout(Exception):
+    """Raised inside minimax once the move deadline has passed."""
+
+# One table per difficulty and board variant, so that deeper searches never
+# leak into easier levels and one variant's results never answer another's.
+# Shared by all requests in the process; the least recently used variant
+# table is dropped past MAX_TABLES, the standard board's never are.
+MAX_TABLES = 9
+_tables = OrderedDict()
+_tables_lock = threading.Lock()
+
+def get_table(difficulty, variant=None):
+    """The shared table for a difficulty on a Geometry.variant (None: standard)."""
+    key = (known_difficulty(difficulty), variant)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            table = _tables[key] = TranspositionTable()
+            for old in [k for k in _tables if k[1] is not None and k != key]:
+                if len(_tables) <= MAX_TABLES:
+                    break
+                del _tables[old]
+        else:
+            _tables.move_to_end(key)
+    return table
+
+def get_table_stats():
+    """Hit/miss counters for every table, keyed 'difficulty' or 'difficulty:variant'."""
+    with _tables_lock:
+        tables = list(_tables.items())
+    return {difficulty if variant is None else f'{difficulty}:{variant}': table.stats()
+            for (difficulty, variant), table in tables}
+
+# Cutoff counters accumulated over all searches, per difficulty
+_ordering_stats = {}
+
+def _record_ordering_stats(difficulty, orderer):
+    totals = _ordering_stats.setdefault(
+        difficulty, {'cutoffs': 0, 'first_move_cutoffs': 0})
+    totals['cutoffs'] += orderer.cutoffs
+    totals['first_move_cutoffs'] += orderer.first_move_cutoffs
+
+def get_ordering_stats():
+    """How often the first move tried produced the beta cutoff, per difficulty."""
+    return {
+        difficulty: dict(
+            totals,
+            first_move_cutoff_rate=(totals['first_move_cutoffs'] / totals['cutoffs']
+                                    if totals['cutoffs'] else 0.0))
+        for difficulty, totals in _ordering_stats.items()
+    }
+
+# Tactical pre-pass counters accumulated over all searches, per difficulty
+_tactics_stats = {}
+
+def _record_tactics(difficulty, reason, pruned):
+    totals = _tactics_stats.setdefault(
+        difficulty, {'positions': 0, 'short_circuits': 0, 'win': 0,
+                     'block': 0, 'only_safe': 0, 'pruned_moves': 0})
+    totals['positions'] += 1
+    totals['pruned_moves'] += pruned
+    if reason is not None:
+        totals['short_circuits'] += 1
+        totals[reason] += 1
+
+def get_tactics_stats():
+    """How often the tactical pre-pass settled the move without a search, per difficulty."""
+    return {
+        difficulty: dict(
+            totals,
+            short_circuit_rate=(totals['short_circuits'] / totals['positions']
+                                if totals['positions'] else 0.0))
+        for difficulty, totals in _tactics_stats.items()
+    }
+
+def minimax(position, depth, alpha, beta, maximizing_player, table=None,
+            deadline=None, orderer=None, root_moves=None, stats=None):
+    """
+    Alpha-beta search from the AI's point of view. root_moves, if given,
+    restricts the columns tried at this node (not below it). stats, a
+    games.search_stats.SearchStats with root_ply set, collects counters.
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        raise SearchTimeout()
+    if stats is not None:
+        stats.visit(position.moves - stats.root_ply)
+
+    valid_locations = position.valid_moves()
+    ai_wins = position.is_win(AI)
+    player_wins = position.is_win(PLAYER)
+    is_terminal = ai_wins or player_wins or not valid_locations
 
-def minimax(board, depth, alpha, beta, maximizing_player):
-    valid_locations = get_valid_locations(board)
-    is_terminal = is_terminal_node(board)
-    
     if depth == 0 or is_terminal:
+        if stats is not None:
+            stats.leaves += 1
         if is_terminal:
-            if winning_move(board, AI):
-                return (None, 100000000000000)
-            elif winning_move(board, PLAYER):
-                return (None, -10000000000000)
+            if ai_wins:
+                return (None, WIN_SCORE)
+            elif player_wins:
+                return (None, LOSS_SCORE)
             else:
                 return (None, 0)
         else:
-            return (None, score_position(board, AI))
-    
+            return (None, position.score(AI))
+
+    hash_move = None
+    if table is not None:
+        key = position.hash ^ SIDE_KEY if maximizing_player else position.hash
+        entry = table.probe(key)
+        if stats is not None:
+            stats.cache_probes += 1
+            stats.cache_hits += entry is not None
+        if entry is not None:
+            hash_move = entry[MOVE]
+            if entry[DEPTH] >= depth:
+                flag, entry_value = entry[FLAG], entry[VALUE]
+                if flag == EXACT:
+                    return hash_move, entry_value
+                if flag == LOWER:
+                    alpha = max(alpha, entry_value)
+                else:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    return hash_move, entry_value
+        alpha_orig, beta_orig = alpha, beta
+    if stats is not None:
+        stats.expanded += 1
+
     if maximizing_player:
         value = -math.inf
-        column = random.choice(valid_locations) if valid_locations else 0
-        
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = [row[:] for row in board]
-            drop_piece(b_copy, row, col, AI)
-            
-            new_score = minimax(b_copy, depth - 1, alpha, beta, False)[1]
-            
+        if orderer is not None:
+            moves = orderer.order(position, AI, hash_move)
+        else:
+            moves = valid_locations
+        if root_moves is not None:
+            moves = [col for col in moves if col in root_moves]
+        column = moves[0]
+
+        for index, col in enumerate(moves):
+            position.play(col, AI)
+            try:
+                new_score = minimax(position, depth - 1, alpha, beta, False,
+                                    table, deadline, orderer, stats=stats)[1]
+            finally:
+                position.undo(col)
+
             if new_score > value:
                 value = new_score
                 column = col
-            
+
             alpha = max(alpha, value)
             if alpha >= beta:
+                if orderer is not None:
+                    orderer.record_cutoff(position, AI, col, depth, index)
+                if stats is not None:
+                    stats.cutoffs += 1
                 break
-        
+
+        if table is not None:
+            _store(table, key, depth, value, column, alpha_orig, beta_orig)
         return column, value
-    
+
     else:
         value = math.inf
-        column = random.choice(valid_locations) if valid_locations else 0
-        
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = [row[:] for row in board]
-            drop_piece(b_copy, row, col, PLAYER)
-            
-            new_score = minimax(b_copy, depth - 1, alpha, beta, True)[1]
-            
+        if orderer is not None:
+            moves = orderer.order(position, PLAYER, hash_move)
+        else:
+            moves = valid_locations
+        if root_moves is not None:
+            moves = [col for col in moves if col in root_moves]
+        column = moves[0]
+
+        for index, col in enumerate(moves):
+            position.play(col, PLAYER)
+            try:
+                new_score = minimax(position, depth - 1, alpha, beta, True,
+                                    table, deadline, orderer, stats=stats)[1]
+            finally:
+                position.undo(col)
+
             if new_score < value:
                 value = new_score
                 column = col
-            
+
             beta = min(beta, value)
             if alpha >= beta:
+                if orderer is not None:
+                    orderer.record_cutoff(position, PLAYER, col, depth, index)
+                if stats is not None:
+                    stats.cutoffs += 1
                 break
-        
+
+        if table is not None:
+            _store(table, key, depth, value, column, alpha_orig, beta_orig)
         return column, value
 
-def get_best_move(board, difficulty='medium'):
-    depth_map = {
-        'easy': 2,
-        'medium': 4,
-        'hard': 6
-    }
-    
-    depth = depth_map.get(difficulty, 4)
-    valid_locations = get_valid_locations(board)
-    
+def _store(table, key, depth, value, column, alpha, beta):
+    if value <= alpha:
+        flag = UPPER
+    elif value >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table.store(key, depth, flag, value, column)
+
+def principal_variation(position, maximizing_player, table, max_length):
+    """
+    Follow best moves stored in the transposition table from a position.
+    Returns the list of columns; the position is left unchanged.
+    """
+    pv = []
+    while len(pv) < max_length and not position.is_terminal():
+        key = position.hash ^ SIDE_KEY if maximizing_player else position.hash
+        entry = table.peek(key)
+        if entry is None or entry[MOVE] is None or not position.can_play(entry[MOVE]):
+            break
+        col = entry[MOVE]
+        position.play(col, AI if maximizing_player else PLAYER)
+        pv.append(col)
+        maximizing_player = not maximizing_player
+    for col in reversed(pv):
+        position.undo(col)
+    return pv
+
+def iterative_deepening(position, max_depth, deadline, table=None,
+                        orderer=None, root_moves=None, stats=None):
+    """
+    Search depth 1, 2, ... up to max_depth until the deadline passes.
+
+    Returns (column, value, depth) from the deepest iteration that finished.
+    The first iteration always runs to completion so there is a move to
+    return even with a budget that is already spent.
+    """
+    best = None
+    for depth in range(1, max_depth + 1):
+        try:
+            col, value = minimax(position, depth, -math.inf, math.inf, True,
+                                 table, deadline if best else None, orderer,
+                                 root_moves, stats)
+        except SearchTimeout:
+            break
+        best = (col, value, depth)
+        # A proven win or loss will not change with more depth
+        if value == WIN_SCORE or value == LOSS_SCORE:
+            break
+    return best
+
+def get_best_move(board, difficulty='medium', table=None, time_budget=None,
+                  details=False, parallel=None, cache=None, k=CONNECT,
+                  depth=None, stats=None, ponder=False):
+    """
+    Pick the AI's column for a list board.
+
+    Without a time budget this is a fixed-depth search for the difficulty.
+    With a budget (seconds, capped at MAX_TIME_BUDGET; NaN, infinite or
+    non-positive budgets use the difficulty's default) it deepens iteratively
+    until the budget runs out; easy and medium still stop at their usual depth, hard keeps going until
+    the board is exhausted. Immediate wins, forced blocks and moves with a
+    single safe reply are played without searching (see tactics.py), and
+    moves that let the human win on top are left out of the search.
+    Difficulties in BOOK_DIFFICULTIES answer from the
+    opening book without searching when the position is in it, and those in
+    ENDGAME_THRESHOLDS switch to the exact solver once few cells are empty.
+    parallel=True (default: difficulty in PARALLEL_DIFFICULTIES) searches
+    on the process pool, falling back to this thread when it is saturated.
+    Searched results go through the process-wide SearchCache unless another
+    cache is passed, or cache=False.
+
+    The board may be any size; k is the number in a row needed to win. The
+    opening book and the endgame solver only cover the standard board.
+    depth, if given, replaces the difficulty's search depth (and caps
+    iterative deepening).
+
+    With details=True, returns (column, info) where info describes how the
+    move was chosen; for solved positions it carries the proven outcome and
+    the number of plies until the game ends. Pass a SearchStats from
+    games.search_stats as stats to have the search counted and timed.
+    Unknown difficulties play as 'medium'. ponder=True marks a background
+    search in the think-time metrics.
+    """
+    difficulty = known_difficulty(difficulty)
+    if time_budget is not None:
+        # NaN would make a deadline that never passes
+        if math.isfinite(time_budget) and time_budget > 0:
+            time_budget = min(time_budget, MAX_TIME_BUDGET)
+        else:
+            time_budget = TIME_BUDGETS.get(difficulty)
+    if parallel is None:
+        parallel = difficulty in PARALLEL_DIFFICULTIES
+    if cache is None:
+        cache = get_search_cache()
+    start = time.perf_counter()
+    kind = 'ponder' if ponder else 'move'
+    with ai_search('connect4', difficulty, kind) as search:
+        col, info = _choose_move(board, difficulty, table, time_budget,
+                                 parallel, cache, k, depth, stats)
+        # Pondering fills the cache, so a cache hit is usually near-instant
+        if info.get('cached') and not ponder:
+            search.kind = 'cached'
+    if stats is not None:
+        stats.elapsed = time.perf_counter() - start
+    return (col, info) if details else col
+
+def _choose_move(board, difficulty, table, time_budget, parallel, cache, k,
+                 depth, stats):
+    position = Position.from_board(board, k)
+    standard = position.geometry.variant is None
+    valid_locations = position.valid_moves()
+
     if not valid_locations:
-        return None
-    
+        return None, {'source': 'none'}
+
     if difficulty == 'easy' and random.random() < 0.3:
-        return random.choice(valid_locations)
-    
-    col, _ = minimax(board, depth, -math.inf, math.inf, True)
-    return col if col is not None else random.choice(valid_locations)
+        return random.choice(valid_locations), {'source': 'random'}
+
+    col, reason, root_moves = tactical_moves(position, AI)
+    _record_tactics(difficulty, reason, len(valid_locations) - len(root_moves))
+    if col is not None:
+        return col, {'source': 'tactics', 'reason': reason}
+
+    if standard and difficulty in BOOK_DIFFICULTIES:
+        book = get_opening_book()
+        if book is not None:
+            col = book.lookup(position)
+            if col is not None and position.can_play(col):
+                return col, {'source': 'book'}
+
+    if cache:
+        # A position and its mirror image share an entry, stored with the
+        # canonical side's column
+        position_key, mirrored = position.canonical_key()
+        budget = time_budget if depth is None else f'{time_budget}/{depth}'
+        key = SearchCache.make_key(position_key, AI, difficulty, budget,
+                                   position.geometry.variant)
+        cached = cache.get(key)
+        if cached is not None:
+            col, info = cached['column'], dict(cached['info'], cached=True)
+            return _mirror_result(position.geometry, col, info) if mirrored else (col, info)
+
+    col, info = _search_move(position, difficulty, table, time_budget, parallel,
+                             root_moves, depth, stats)
+    if cache:
+        stored_col, stored_info = (_mirror_result(position.geometry, col, info)
+                                   if mirrored else (col, info))
+        cache.put(key, {'column': stored_col, 'info': stored_info})
+    return col, info
+
+def _mirror_result(geometry, col, info):
+    """A move and its info for the mirror image of the position."""
+    if 'column' in info:
+        info = dict(info, column=geometry.mirror_col(info['column']))
+    return geometry.mirror_col(col), info
+
+def _search_move(position, difficulty, table, time_budget, parallel,
+                 root_moves=None, depth=None, stats=None):
+    empty = position.geometry.size - position.moves
+    threshold = ENDGAME_THRESHOLDS.get(difficulty)
+    if (threshold is not None and empty <= threshold
+            and position.geometry.variant is None):
+        result = solve_best_move(position, AI)
+        if stats is not None:
+            stats.nodes += result['nodes']
+        return result['column'], dict(result, source='solver')
+
+    if depth is None:
+        if time_budget is not None and difficulty == 'hard':
+            depth = empty
+        else:
+            depth = DEPTH_MAP.get(difficulty, 4)
+
+    if parallel:
+        # Imported here because the parallel module builds on this one
+        from .parallel import parallel_search
+        result = parallel_search(position, depth, time_budget, root_moves,
+                                 difficulty)
+        if result is not None:
+            col, value, depth = result
+            return col, {'source': 'parallel', 'value': value, 'depth': depth}
+
+    if table is None:
+        table = get_table(difficulty, position.geometry.variant)
+    table.new_search()
+    orderer = MoveOrderer(position.geometry)
+    orderer.new_search(position)
+    if stats is not None:
+        stats.root_ply = position.moves
+
+    if time_budget is not None:
+        deadline = time.monotonic() + time_budget
+        col, value, depth = iterative_deepening(position, depth, deadline,
+                                                table, orderer, root_moves,
+                                                stats)
+    else:
+        col, value = minimax(position, depth, -math.inf, math.inf, True,
+                             table, orderer=orderer, root_moves=root_moves,
+                             stats=stats)
+    _record_ordering_stats(difficulty, orderer)
+    if col is None:
+        col = random.choice(root_moves or position.valid_moves())
+    return col, {'source': 'search', 'value': value, 'depth': depth}
@@ -0,0 +1,71 @@
+"""
+Connect-4 Move Ordering
+Decides the order in which minimax tries columns: the hash move from the
+transposition table first, then killer moves for the ply, then the rest by
+history score with a center-out static order breaking ties.
+"""
+from .bitboard import STANDARD
+
+# Center-out column order of the standard board; other sizes use
+# Geometry.center_order
+CENTER_ORDER = STANDARD.center_order
+
+KILLER_SLOTS = 2
+
+
+class MoveOrderer:
+    """Killer and history tables for one search, plus cutoff counters."""
+
+    def __init__(self, geometry=STANDARD):
+        self.geometry = geometry
+        self.killers = [[None] * KILLER_SLOTS for _ in range(geometry.size + 1)]
+        # Indexed by piece, then by bit index of the cell the move fills
+        self.history = [[0] * (geometry.cols * geometry.h1) for _ in range(3)]
+        self.root_moves = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self, position):
+        """Anchor ply numbering at the root position."""
+        self.root_moves = position.moves
+
+    def order(self, position, piece, hash_move=None):
+        heights = position.heights
+        history = self.history[piece]
+        rows, h1 = self.geometry.rows, self.geometry.h1
+        moves = [c for c in self.geometry.center_order if heights[c] < rows]
+        # Stable sort, so equal history scores keep the center-out order
+        moves.sort(key=lambda c: history[c * h1 + heights[c]], reverse=True)
+
+        front = 0
+        if hash_move is not None and hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+            front = 1
+        for killer in self.killers[position.moves - self.root_moves]:
+            if killer is not None and killer in moves[front:]:
+                moves.remove(killer)
+                moves.insert(front, killer)
+                front += 1
+        return moves
+
+    def record_cutoff(self, position, piece, col, depth, index):
+        """Update killers and history after col (tried index-th) caused a cutoff."""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+        killers = self.killers[position.moves - self.root_moves]
+        if killers[0] != col:
+            killers[1:] = killers[:-1]
+            killers[0] = col
+
+        self.history[piece][col * self.geometry.h1 + position.heights[col]] += depth * depth
+
+    def stats(self):
+        return {
+            'cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': (self.first_move_cutoffs / self.cutoffs
+                                       if self.cutoffs else 0.0),
+        }
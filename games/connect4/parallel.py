@@ -0,0 +1,184 @@
+"""
+Connect-4 Root-Parallel Search
+Splits the root moves of a search across a persistent process pool. Each
+worker searches one root move with its own long-lived transposition table,
+so work done for earlier requests keeps paying off in later ones.
+
+Measure speedup against core count with:
+    python -m games.connect4.parallel
+"""
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .engine import AI
+from .bitboard import Position
+from .minimax import MAX_TABLES, minimax, SearchTimeout
+from .ordering import MoveOrderer
+from .transposition import TranspositionTable
+
+# Parallel searches allowed at once. Past this the pool counts as saturated
+# and callers search serially in their own thread.
+MAX_CONCURRENT_SEARCHES = 2
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+_search_slots = threading.BoundedSemaphore(MAX_CONCURRENT_SEARCHES)
+
+# Per-worker-process transposition tables, keyed like minimax.get_table
+# by (difficulty, variant); the least recently used is dropped past
+# MAX_TABLES
+_worker_tables = OrderedDict()
+
+
+def get_pool(workers=None):
+    """The persistent worker pool, started on first use."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = workers or os.cpu_count() or 1
+            # spawn, not fork: the web server may have other threads running
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def _worker_table(difficulty, variant):
+    key = (difficulty, variant)
+    table = _worker_tables.get(key)
+    if table is None:
+        table = _worker_tables[key] = TranspositionTable()
+        while len(_worker_tables) > MAX_TABLES:
+            _worker_tables.popitem(last=False)
+    else:
+        _worker_tables.move_to_end(key)
+    return table
+
+
+def _search_root_move(board, col, depth, deadline, k, difficulty=None):
+    """
+    Worker task: play col for the AI and search the reply tree.
+
+    Returns {root_depth: value} for every depth that finished. A fixed-depth
+    search (deadline None) returns a single entry; otherwise depths are
+    searched one at a time until the time.monotonic() deadline passes.
+    Depth 1 always finishes, so a task that only starts after its deadline
+    returns just that.
+    """
+    position = Position.from_board(board, k)
+    table = _worker_table(difficulty, position.geometry.variant)
+    table.new_search()
+    position.play(col, AI)
+    orderer = MoveOrderer(position.geometry)
+    orderer.new_search(position)
+
+    if deadline is None:
+        _, value = minimax(position, depth - 1, -math.inf, math.inf, False,
+                           table, orderer=orderer)
+        return {depth: value}
+
+    values = {}
+    for d in range(1, depth + 1):
+        try:
+            _, values[d] = minimax(position, d - 1, -math.inf, math.inf,
+                                   False, table,
+                                   deadline if values else None, orderer)
+        except SearchTimeout:
+            break
+    return values
+
+
+def parallel_search(position, depth, time_budget=None, root_moves=None,
+                    difficulty=None):
+    """
+    Search every root move of a Position (AI to move) on the pool, or only
+    those in root_moves if given. Workers keep a table per difficulty and
+    board variant.
+
+    Returns (column, value, depth), where depth is the deepest root depth
+    finished for every move, or None if the pool is saturated or unusable;
+    the caller should then search serially. The budget covers the whole
+    search, including moves still queued behind busy workers.
+    """
+    if not _search_slots.acquire(blocking=False):
+        return None
+    start = time.monotonic()
+    try:
+        board = position.to_board()
+        moves = [c for c in position.geometry.center_order
+                 if position.can_play(c)
+                 and (root_moves is None or c in root_moves)]
+        pool = get_pool()
+        # With more moves than workers the tasks run in waves. Each wave
+        # gets an equal slice of the budget and the last one ends with it,
+        # so queued moves get no fresh budget and every move reaches a
+        # similar depth for the comparison below.
+        waves = -(-len(moves) // _pool_workers)
+        deadlines = [None if time_budget is None
+                     else start + time_budget * (index // _pool_workers + 1) / waves
+                     for index in range(len(moves))]
+        futures = [pool.submit(_search_root_move, board, col, depth,
+                               deadline, position.geometry.k, difficulty)
+                   for col, deadline in zip(moves, deadlines)]
+        results = [future.result() for future in futures]
+    except BrokenProcessPool:
+        shutdown_pool()
+        return None
+    finally:
+        _search_slots.release()
+
+    # Compare moves at the deepest depth that every worker completed
+    common = min(max(values) for values in results)
+    best_col, best_value = None, -math.inf
+    for col, values in zip(moves, results):
+        if values[common] > best_value:
+            best_col, best_value = col, values[common]
+    return best_col, best_value, common
+
+
+def _measure_speedup(depth=7, positions=5):
+    from ..benchmarks import connect4_positions
+
+    # Seven random plies with the player starting leaves the AI to move
+    samples = connect4_positions(positions, plies=7)
+
+    start = time.perf_counter()
+    for position in samples:
+        orderer = MoveOrderer(position.geometry)
+        orderer.new_search(position)
+        minimax(position, depth, -math.inf, math.inf, True,
+                TranspositionTable(), orderer=orderer)
+    serial = time.perf_counter() - start
+    print(f'serial: {serial:.2f}s')
+
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        shutdown_pool()
+        pool = get_pool(workers)
+        # Start every worker before timing
+        list(pool.map(abs, range(workers)))
+        start = time.perf_counter()
+        for position in samples:
+            parallel_search(position, depth)
+        elapsed = time.perf_counter() - start
+        print(f'{workers} workers: {elapsed:.2f}s, '
+              f'speedup {serial / elapsed:.2f}x')
+    shutdown_pool()
+
+
+if __name__ == '__main__':
+    _measure_speedup()
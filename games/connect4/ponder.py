@@ -0,0 +1,124 @@
+"""
+Connect-4 Pondering
+While the human is thinking, search the AI's answer to each of their
+possible replies in the background. Results land in the process-wide search
+cache, so the next make_move usually finds its answer already computed.
+
+Each game gets a CPU budget for background work. A search that has already
+started is allowed to finish, so the cap can be overshot by at most one
+search.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .engine import (
+    CONNECT, PLAYER, get_next_open_row, drop_piece, winning_move
+)
+from .bitboard import get_geometry
+from .minimax import get_best_move
+
+# Difficulties worth pondering; easy searches are too cheap to bother
+PONDER_DIFFICULTIES = ('medium', 'hard')
+
+# Background CPU seconds allowed per game between two human moves
+PONDER_CPU_BUDGET = 3.0
+
+# Games whose pondering state is kept; older ones are dropped
+MAX_TRACKED_GAMES = 1000
+
+_executor = ThreadPoolExecutor(max_workers=1,
+                               thread_name_prefix='connect4-ponder')
+_lock = threading.Lock()
+_games = OrderedDict()
+
+
+class _PonderState:
+    def __init__(self):
+        self.cancelled = False
+        self.cpu_used = 0.0
+        self.futures = {}  # human column -> Future
+        self.completed = 0
+        self.skipped = 0
+
+
+def _ponder_reply(state, board, col, difficulty, time_budget, k):
+    if state.cancelled or state.cpu_used >= PONDER_CPU_BUDGET:
+        state.skipped += 1
+        return None
+    start = time.thread_time()
+    try:
+        return get_best_move(board, difficulty, time_budget=time_budget,
+                             details=True, k=k, ponder=True)
+    finally:
+        state.cpu_used += time.thread_time() - start
+        state.completed += 1
+
+
+def start_pondering(game_id, board, difficulty, time_budget=None, k=CONNECT):
+    """
+    Queue background searches for the AI's answer to every human reply.
+    board is the position with the human to move; it is not modified.
+    """
+    if difficulty not in PONDER_DIFFICULTIES:
+        return
+    state = _PonderState()
+    with _lock:
+        old = _games.pop(game_id, None)
+        if old is not None:
+            old.cancelled = True
+        _games[game_id] = state
+        while len(_games) > MAX_TRACKED_GAMES:
+            _, dropped = _games.popitem(last=False)
+            dropped.cancelled = True
+
+    for col in get_geometry(len(board), len(board[0]), k).center_order:
+        row = get_next_open_row(board, col)
+        if row == -1:
+            continue
+        reply = [r[:] for r in board]
+        drop_piece(reply, row, col, PLAYER)
+        if winning_move(reply, PLAYER, k):
+            continue
+        state.futures[col] = _executor.submit(
+            _ponder_reply, state, reply, col, difficulty, time_budget, k)
+
+
+def wait_for_ponder(game_id, col):
+    """
+    Called once the human has played col. If the answer is being pondered
+    right now, wait for it so the caller's search hits the cache; if it is
+    still queued, cancel it and let the caller search directly. All other
+    pondering for the game is cancelled.
+    """
+    with _lock:
+        state = _games.pop(game_id, None)
+    if state is None:
+        return
+    state.cancelled = True
+    future = state.futures.get(col)
+    if future is not None and not future.cancel():
+        try:
+            future.result()
+        except Exception:
+            # The caller's own search will surface any real problem
+            pass
+
+
+def cancel_pondering(game_id):
+    with _lock:
+        state = _games.pop(game_id, None)
+    if state is not None:
+        state.cancelled = True
+
+
+def get_ponder_stats():
+    with _lock:
+        states = list(_games.values())
+    return {
+        'games': len(states),
+        'cpu_used': sum(state.cpu_used for state in states),
+        'completed': sum(state.completed for state in states),
+        'skipped': sum(state.skipped for state in states),
+    }
@@ -1,10 +1,64 @@
 """
 Connect-4 Flask Routes with Human vs Human Support
 """
-from flask import render_template, request, jsonify, session
+import uuid
+from flask import Response, render_template, request, jsonify, session
+from ..jobs import job_manager, JobQueueFull
+from ..search_stats import SearchStats, search_stats
 from . import connect4_bp
 from .engine import *
-from .minimax import get_best_move
+from .analysis import analyze_position
+from .minimax import get_best_move, known_difficulty, TIME_BUDGETS, MAX_TIME_BUDGET
+from .ponder import start_pondering, wait_for_ponder, cancel_pondering
+
+def _game_id():
+    """Identifier of the session's current game, used to track pondering."""
+    game_id = session.get('connect4_game_id')
+    if game_id is None:
+        game_id = session['connect4_game_id'] = uuid.uuid4().hex
+    return game_id
+
+def _new_game_id():
+    cancel_pondering(session.get('connect4_game_id'))
+    session['connect4_game_id'] = uuid.uuid4().hex
+    session.pop('connect4_pending_job', None)
+
+# Longest a job poll may block, in seconds
+MAX_JOB_WAIT = 30
+
+# Largest board a game may ask for; the search slows down with every column
+MAX_ROWS = 10
+MAX_COLS = 12
+
+def _board_geometry(data):
+    """Read rows, cols and connect (k) for a new game, defaulting to standard."""
+    rows = int(data.get('rows', ROWS))
+    cols = int(data.get('cols', COLS))
+    k = int(data.get('connect', CONNECT))
+    if not (4 <= rows <= MAX_ROWS and 4 <= cols <= MAX_COLS
+            and 3 <= k <= min(rows, cols)):
+        raise ValueError(f'Unsupported board: {rows}x{cols}, connect {k}')
+    return rows, cols, k
+
+def _time_budget(data, difficulty):
+    """The AI's time budget in seconds from the request, or the difficulty's default."""
+    time_budget = data.get('time_budget')
+    if time_budget is None:
+        return TIME_BUDGETS.get(difficulty)
+    try:
+        time_budget = float(time_budget)
+    except (TypeError, ValueError):
+        raise ValueError('time_budget must be a number of seconds')
+    # Written so that NaN fails too
+    if not time_budget > 0:
+        raise ValueError('time_budget must be positive')
+    return min(time_budget, MAX_TIME_BUDGET)
+
+def _bad_request(error):
+    return jsonify({
+        'success': False,
+        'message': str(error)
+    }), 400
 
 @connect4_bp.route('/play')
 def play():
@@ -13,125 +67,285 @@ def play():
 @connect4_bp.route('/connect4')
 def connect4_game():
     session['connect4_board'] = create_board()
+    session['connect4_connect'] = CONNECT
     session['connect4_game_over'] = False
     session['connect4_turn'] = PLAYER
     session['connect4_winner'] = None
     session['connect4_game_mode'] = 'ai'  # 'ai' or 'human'
+    _new_game_id()
     return render_template('connect4/play.html')
 
+def _play_human_move(data):
+    """
+    Validate and play the requested column for the side to move.
+
+    Returns (response, board). response is set when the request is finished
+    without an AI move: an invalid move, a win or draw, or a turn in human
+    vs human mode. Otherwise the board is waiting for the AI's reply.
+    """
+    col = int(data.get('column', -1))
+    game_mode = session.get('connect4_game_mode', 'ai')
+    
+    board = session.get('connect4_board', create_board())
+    game_over = session.get('connect4_game_over', False)
+    current_turn = session.get('connect4_turn', PLAYER)
+    k = session.get('connect4_connect', CONNECT)
+    
+    if session.get('connect4_pending_job'):
+        return {
+            'success': False,
+            'message': 'AI is still thinking'
+        }, board
+    
+    if game_over or not is_valid_location(board, col):
+        return {
+            'success': False, 
+            'message': 'Invalid move or game is over'
+        }, board
+    
+    # Current player move
+    row = get_next_open_row(board, col)
+    if row == -1:
+        return {
+            'success': False,
+            'message': 'Column is full'
+        }, board
+    
+    drop_piece(board, row, col, current_turn)
+    
+    # Pick up the pondered answer to this move, if one is in progress
+    wait_for_ponder(_game_id(), col)
+    
+    # Check for win
+    if winning_move(board, current_turn, k):
+        session['connect4_board'] = board
+        session['connect4_game_over'] = True
+        winner = 'player' if current_turn == PLAYER else ('player2' if game_mode == 'human' else 'ai')
+        session['connect4_winner'] = winner
+        return {
+            'success': True,
+            'board': board,
+            'winner': winner,
+            'game_over': True,
+            'message': f'{"Player 1" if current_turn == PLAYER else "Player 2"} wins!' if game_mode == 'human' else ('You win!' if winner == 'player' else 'AI wins!')
+        }, board
+    
+    # Check for draw
+    if len(get_valid_locations(board)) == 0:
+        session['connect4_board'] = board
+        session['connect4_game_over'] = True
+        session['connect4_winner'] = 'draw'
+        return {
+            'success': True,
+            'board': board,
+            'winner': 'draw',
+            'game_over': True,
+            'message': 'It\'s a draw!'
+        }, board
+    
+    # Human vs Human mode - just switch turns
+    if game_mode == 'human':
+        session['connect4_turn'] = AI if current_turn == PLAYER else PLAYER
+        session['connect4_board'] = board
+        next_player = 'Player 2' if current_turn == PLAYER else 'Player 1'
+        return {
+            'success': True,
+            'board': board,
+            'winner': None,
+            'game_over': False,
+            'message': f'{next_player}\'s turn',
+            'current_turn': AI if current_turn == PLAYER else PLAYER
+        }, board
+    
+    return None, board
+
+def _play_ai_move(board, ai_col, difficulty, time_budget):
+    """Drop the AI's piece, store the result in the session and build the response."""
+    if ai_col is not None:
+        ai_row = get_next_open_row(board, ai_col)
+        if ai_row != -1:
+            drop_piece(board, ai_row, ai_col, AI)
+            
+            # Check for AI win
+            if winning_move(board, AI, session.get('connect4_connect', CONNECT)):
+                session['connect4_board'] = board
+                session['connect4_game_over'] = True
+                session['connect4_winner'] = 'ai'
+                return {
+                    'success': True,
+                    'board': board,
+                    'winner': 'ai',
+                    'game_over': True,
+                    'ai_move': ai_col,
+                    'message': 'AI wins!'
+                }
+            
+            # Check for draw after AI move
+            if len(get_valid_locations(board)) == 0:
+                session['connect4_board'] = board
+                session['connect4_game_over'] = True
+                session['connect4_winner'] = 'draw'
+                return {
+                    'success': True,
+                    'board': board,
+                    'winner': 'draw',
+                    'game_over': True,
+                    'ai_move': ai_col,
+                    'message': 'It\'s a draw!'
+                }
+    
+    session['connect4_board'] = board
+    start_pondering(_game_id(), board, difficulty, time_budget,
+                    session.get('connect4_connect', CONNECT))
+    return {
+        'success': True,
+        'board': board,
+        'winner': None,
+        'game_over': False,
+        'ai_move': ai_col,
+        'message': 'Your turn'
+    }
+
 @connect4_bp.route('/api/make_move', methods=['POST'])
 def make_move():
     try:
         data = request.get_json()
-        col = int(data.get('column', -1))
-        difficulty = data.get('difficulty', 'medium')
-        game_mode = session.get('connect4_game_mode', 'ai')
+        difficulty = known_difficulty(data.get('difficulty', 'medium'))
+        try:
+            time_budget = _time_budget(data, difficulty)
+        except ValueError as e:
+            return _bad_request(e)
         
-        board = session.get('connect4_board', create_board())
-        game_over = session.get('connect4_game_over', False)
-        current_turn = session.get('connect4_turn', PLAYER)
+        response, board = _play_human_move(data)
+        if response is not None:
+            return jsonify(response)
         
-        if game_over or not is_valid_location(board, col):
-            return jsonify({
-                'success': False, 
-                'message': 'Invalid move or game is over'
-            })
+        # AI mode - make AI move, with search statistics if asked for
+        stats = SearchStats() if data.get('stats') else None
+        ai_col = get_best_move(board, difficulty, time_budget=time_budget,
+                               k=session.get('connect4_connect', CONNECT),
+                               stats=stats)
+        response = _play_ai_move(board, ai_col, difficulty, time_budget)
+        if stats is not None:
+            search_stats.record('connect4', difficulty, stats)
+            response['stats'] = stats.to_dict()
+        return jsonify(response)
         
-        # Current player move
-        row = get_next_open_row(board, col)
-        if row == -1:
-            return jsonify({
-                'success': False,
-                'message': 'Column is full'
-            })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        })
+
+@connect4_bp.route('/api/jobs/make_move', methods=['POST'])
+def submit_move_job():
+    """Play the human's move now and queue the AI's reply as a background job."""
+    before = [row[:] for row in session.get('connect4_board', create_board())]
+    try:
+        data = request.get_json()
+        difficulty = known_difficulty(data.get('difficulty', 'medium'))
+        try:
+            time_budget = _time_budget(data, difficulty)
+        except ValueError as e:
+            return _bad_request(e)
         
-        drop_piece(board, row, col, current_turn)
+        response, board = _play_human_move(data)
+        if response is not None:
+            return jsonify(response)
         
-        # Check for win
-        if winning_move(board, current_turn):
-            session['connect4_board'] = board
-            session['connect4_game_over'] = True
-            winner = 'player' if current_turn == PLAYER else ('player2' if game_mode == 'human' else 'ai')
-            session['connect4_winner'] = winner
-            return jsonify({
-                'success': True,
-                'board': board,
-                'winner': winner,
-                'game_over': True,
-                'message': f'{"Player 1" if current_turn == PLAYER else "Player 2"} wins!' if game_mode == 'human' else ('You win!' if winner == 'player' else 'AI wins!')
-            })
+        job = job_manager.submit('connect4', get_best_move,
+                                 [row[:] for row in board], difficulty,
+                                 time_budget=time_budget,
+                                 k=session.get('connect4_connect', CONNECT))
+        session['connect4_board'] = board
+        session['connect4_pending_job'] = {
+            'job_id': job.id,
+            'difficulty': difficulty,
+            'time_budget': time_budget
+        }
+        return jsonify(dict(job.to_dict(),
+                            success=True,
+                            board=board,
+                            message='AI is thinking'))
         
-        # Check for draw
-        if len(get_valid_locations(board)) == 0:
-            session['connect4_board'] = board
-            session['connect4_game_over'] = True
-            session['connect4_winner'] = 'draw'
+    except JobQueueFull as e:
+        session['connect4_board'] = before
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Server error: {str(e)}'
+        })
+
+@connect4_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_move_job(job_id):
+    """
+    Poll a move job. ?wait=N long-polls for up to N seconds. Once the job is
+    done, the first fetch from the submitting session plays the AI's move.
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_JOB_WAIT)
+        job = job_manager.get(job_id, wait)
+        if job is None:
             return jsonify({
-                'success': True,
-                'board': board,
-                'winner': 'draw',
-                'game_over': True,
-                'message': 'It\'s a draw!'
+                'success': False,
+                'message': 'Unknown job'
             })
         
-        # Human vs Human mode - just switch turns
-        if game_mode == 'human':
-            session['connect4_turn'] = AI if current_turn == PLAYER else PLAYER
-            session['connect4_board'] = board
-            next_player = 'Player 2' if current_turn == PLAYER else 'Player 1'
-            return jsonify({
-                'success': True,
-                'board': board,
-                'winner': None,
-                'game_over': False,
-                'message': f'{next_player}\'s turn',
-                'current_turn': AI if current_turn == PLAYER else PLAYER
-            })
+        pending = session.get('connect4_pending_job')
+        if not job.done.is_set() or not pending or pending['job_id'] != job.id:
+            return jsonify(dict(job.to_dict(), success=True))
         
-        # AI mode - make AI move
-        ai_col = get_best_move(board, difficulty)
-        if ai_col is not None:
-            ai_row = get_next_open_row(board, ai_col)
-            if ai_row != -1:
-                drop_piece(board, ai_row, ai_col, AI)
-                
-                # Check for AI win
-                if winning_move(board, AI):
-                    session['connect4_board'] = board
-                    session['connect4_game_over'] = True
-                    session['connect4_winner'] = 'ai'
-                    return jsonify({
-                        'success': True,
-                        'board': board,
-                        'winner': 'ai',
-                        'game_over': True,
-                        'ai_move': ai_col,
-                        'message': 'AI wins!'
-                    })
-                
-                # Check for draw after AI move
-                if len(get_valid_locations(board)) == 0:
-                    session['connect4_board'] = board
-                    session['connect4_game_over'] = True
-                    session['connect4_winner'] = 'draw'
-                    return jsonify({
-                        'success': True,
-                        'board': board,
-                        'winner': 'draw',
-                        'game_over': True,
-                        'ai_move': ai_col,
-                        'message': 'It\'s a draw!'
-                    })
+        session.pop('connect4_pending_job')
+        board = session.get('connect4_board', create_board())
+        ai_col = job.result
+        if job.status == 'error':
+            # Fall back to searching here rather than leave the game stuck
+            ai_col = get_best_move(board, pending['difficulty'],
+                                   time_budget=pending['time_budget'],
+                                   k=session.get('connect4_connect', CONNECT))
+        response = _play_ai_move(board, ai_col, pending['difficulty'],
+                                 pending['time_budget'])
+        return jsonify(dict(job.to_dict(), **response))
         
-        session['connect4_board'] = board
+    except Exception as e:
         return jsonify({
-            'success': True,
-            'board': board,
-            'winner': None,
-            'game_over': False,
-            'ai_move': ai_col,
-            'message': 'Your turn'
+            'success': False,
+            'message': f'Server error: {str(e)}'
         })
+
+@connect4_bp.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_move_job(job_id):
+    """
+    Server-sent events with the job's status changes. The stream cannot
+    update the session, so fetch /api/jobs/<job_id> once it reports done.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Unknown job'
+        })
+    return Response(job_manager.stream(job), mimetype='text/event-stream')
+
+@connect4_bp.route('/api/analysis', methods=['GET'])
+def analysis():
+    """Score every legal column for the side to move in the session's game."""
+    try:
+        difficulty = known_difficulty(request.args.get('difficulty', 'medium'))
+        board = session.get('connect4_board', create_board())
+        if session.get('connect4_game_over', False):
+            return jsonify({
+                'success': False,
+                'message': 'Game is over'
+            })
+        side = session.get('connect4_turn', PLAYER)
+        result = analyze_position(board, side, difficulty,
+                                  k=session.get('connect4_connect', CONNECT))
+        return jsonify(dict(result, success=True, side=side))
         
     except Exception as e:
         return jsonify({
@@ -139,33 +353,52 @@ def make_move():
             'message': f'Server error: {str(e)}'
         })
 
+@connect4_bp.route('/api/stats', methods=['GET'])
+def get_search_stats():
+    """Search statistics per difficulty, over AI moves that collected them."""
+    return jsonify({
+        'success': True,
+        'stats': search_stats.summary('connect4')
+    })
+
 @connect4_bp.route('/api/new_game', methods=['POST'])
 def new_game():
     try:
         data = request.get_json()
         ai_first = data.get('ai_first', False)
-        difficulty = data.get('difficulty', 'medium')
+        difficulty = known_difficulty(data.get('difficulty', 'medium'))
+        try:
+            time_budget = _time_budget(data, difficulty)
+        except ValueError as e:
+            return _bad_request(e)
         game_mode = data.get('game_mode', 'ai')  # 'ai' or 'human'
+        rows, cols, k = _board_geometry(data)
         
-        board = create_board()
+        board = create_board(rows, cols)
         session['connect4_board'] = board
+        session['connect4_connect'] = k
         session['connect4_game_over'] = False
         session['connect4_winner'] = None
         session['connect4_game_mode'] = game_mode
         session['connect4_turn'] = AI if ai_first else PLAYER
+        _new_game_id()
         
         response_data = {
             'success': True,
             'board': board,
             'ai_first': ai_first,
             'game_mode': game_mode,
+            'rows': rows,
+            'cols': cols,
+            'connect': k,
             'current_turn': AI if ai_first else PLAYER,
             'message': 'Player 2\'s turn' if (game_mode == 'human' and ai_first) else ('Player 1\'s turn' if game_mode == 'human' else ('AI\'s turn' if ai_first else 'Your turn'))
         }
         
         # Only make AI move if in AI mode and AI goes first
         if game_mode == 'ai' and ai_first:
-            ai_col = get_best_move(board, difficulty)
+            ai_col = get_best_move(board, difficulty, time_budget=time_budget,
+                                   k=k)
             if ai_col is not None:
                 ai_row = get_next_open_row(board, ai_col)
                 drop_piece(board, ai_row, ai_col, AI)
@@ -173,6 +406,8 @@ def new_game():
                 response_data['board'] = board
                 response_data['ai_move'] = ai_col
                 response_data['message'] = 'Your turn'
+                start_pondering(session['connect4_game_id'], board, difficulty,
+                                time_budget, k)
         
         return jsonify(response_data)
         
@@ -0,0 +1,186 @@
+"""
+Connect-4 Endgame Solver
+Perfect-play negamax for late positions, with null-window (MTD-style)
+narrowing of the score range and its own memo of upper bounds.
+
+Scores follow the usual convention: positive if the side to move wins,
+negative if it loses, 0 for a draw, and larger in magnitude the sooner the
+game is decided.
+"""
+from .engine import ROWS, COLS, PLAYER, AI
+from .bitboard import H1, BOTTOM_MASK
+from .ordering import CENTER_ORDER
+
+CELLS = ROWS * COLS
+BOARD_MASK = BOTTOM_MASK * ((1 << ROWS) - 1)
+COLUMN_MASKS = tuple(((1 << ROWS) - 1) << (c * H1) for c in range(COLS))
+
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(x):
+        return bin(x).count('1')
+
+
+def _half(x):
+    """Integer division by two rounding toward zero."""
+    return int(x / 2)
+
+
+def winning_cells(current, mask):
+    """Empty cells where `current` would complete four in a row."""
+    r = (current << 1) & (current << 2) & (current << 3)
+    for shift in (H1, H1 - 1, H1 + 1):
+        p = (current << shift) & (current << (2 * shift))
+        r |= p & (current << (3 * shift))
+        r |= p & (current >> shift)
+        p = (current >> shift) & (current >> (2 * shift))
+        r |= p & (current << shift)
+        r |= p & (current >> (3 * shift))
+    return r & (BOARD_MASK ^ mask)
+
+
+def playable_cells(mask):
+    """The lowest empty cell of every column that is not full."""
+    return (mask + BOTTOM_MASK) & BOARD_MASK
+
+
+class EndgameSolver:
+    """Solver with a fixed-size, replace-always memo of upper bounds."""
+
+    def __init__(self, memo_size=1 << 18):
+        self.memo_size = memo_size
+        self.memo = [None] * memo_size
+        self.nodes = 0
+
+    def _negamax(self, current, mask, moves, alpha, beta):
+        # Precondition: the side to move cannot win on this move
+        self.nodes += 1
+        possible = playable_cells(mask)
+        opp_win = winning_cells(current ^ mask, mask)
+        forced = possible & opp_win
+        if forced:
+            if forced & (forced - 1):
+                # Two immediate threats, only one can be blocked
+                return -((CELLS - moves) // 2)
+            possible = forced
+        # Never play directly below an opponent winning cell
+        possible &= ~(opp_win >> 1)
+        if not possible:
+            return -((CELLS - moves) // 2)
+        if moves >= CELLS - 2:
+            return 0
+
+        lower = -((CELLS - 2 - moves) // 2)
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+        upper = (CELLS - 1 - moves) // 2
+        key = current + mask
+        slot = self.memo[key % self.memo_size]
+        if slot is not None and slot[0] == key:
+            upper = slot[1]
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        # Try moves that create the most new threats first
+        candidates = []
+        for col in CENTER_ORDER:
+            move = possible & COLUMN_MASKS[col]
+            if move:
+                threats = popcount(winning_cells(current | move, mask))
+                candidates.append((threats, move))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+
+        opponent = current ^ mask
+        for _, move in candidates:
+            score = -self._negamax(opponent, mask | move, moves + 1,
+                                   -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.memo[key % self.memo_size] = (key, alpha)
+        return alpha
+
+    def solve(self, current, mask, moves):
+        """Exact score for the side whose stones are `current`, to move."""
+        if winning_cells(current, mask) & playable_cells(mask):
+            return (CELLS + 1 - moves) // 2
+        low = -((CELLS - moves) // 2)
+        high = (CELLS + 1 - moves) // 2
+        while low < high:
+            med = low + (high - low) // 2
+            if med <= 0 and _half(low) < med:
+                med = _half(low)
+            elif med >= 0 and _half(high) > med:
+                med = _half(high)
+            result = self._negamax(current, mask, moves, med, med + 1)
+            if result <= med:
+                high = result
+            else:
+                low = result
+        return low
+
+
+def score_to_outcome(score, moves):
+    """
+    Turn a solver score for the side to move at `moves` pieces into
+    ('win' | 'loss' | 'draw', plies until the game ends under perfect play).
+    """
+    if score == 0:
+        return 'draw', CELLS - moves
+    # The winner completes four with the piece that brings the board from
+    # n to n + 1 pieces, where score == (CELLS + 1 - n) // 2.
+    n = CELLS + 1 - 2 * abs(score)
+    winner_parity = moves % 2 if score > 0 else (moves + 1) % 2
+    if n % 2 != winner_parity:
+        n -= 1
+    return ('win' if score > 0 else 'loss'), n - moves + 1
+
+
+def solve_best_move(position, piece, solver=None):
+    """
+    Solve every legal move for `piece` (to move) in a Position.
+
+    Returns a dict with the chosen column, its score from piece's side, the
+    outcome and the number of plies until the game ends with perfect play.
+    Only the standard board is supported.
+    """
+    if position.geometry.variant is not None:
+        raise ValueError('The endgame solver only handles the standard board')
+    if solver is None:
+        solver = EndgameSolver()
+    opp = PLAYER if piece == AI else AI
+    current = position.pieces[piece]
+    mask = current | position.pieces[opp]
+    moves = position.moves
+
+    best_col, best_score = None, None
+    for col in CENTER_ORDER:
+        if not position.can_play(col):
+            continue
+        move = playable_cells(mask) & COLUMN_MASKS[col]
+        if winning_cells(current, mask) & move:
+            score = (CELLS + 1 - moves) // 2
+        elif moves + 1 == CELLS:
+            score = 0
+        else:
+            # Score the reply position from the opponent's side and negate
+            score = -solver.solve(current ^ mask, mask | move, moves + 1)
+        if best_score is None or score > best_score:
+            best_col, best_score = col, score
+
+    outcome, plies = score_to_outcome(best_score, moves)
+    return {
+        'column': best_col,
+        'score': best_score,
+        'outcome': outcome,
+        'plies': plies,
+        'nodes': solver.nodes,
+    }
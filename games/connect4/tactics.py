@@ -0,0 +1,58 @@
+"""
+Connect-4 Tactical Pre-pass
+Cheap checks run before the full search: take an immediate win, block the
+opponent's immediate win, and avoid moves that let the opponent win by
+playing directly on top. When only one move survives, no search is needed.
+"""
+from .engine import PLAYER, AI
+
+def _winning_columns(position, piece, moves):
+    wins = []
+    for col in moves:
+        position.play(col, piece)
+        if position.is_win(piece):
+            wins.append(col)
+        position.undo(col)
+    return wins
+
+def _gives_win_above(position, piece, col):
+    """True if playing col lets the opponent win in the cell above it."""
+    opponent = PLAYER if piece == AI else AI
+    position.play(col, piece)
+    try:
+        if not position.can_play(col):
+            return False
+        position.play(col, opponent)
+        won = position.is_win(opponent)
+        position.undo(col)
+        return won
+    finally:
+        position.undo(col)
+
+def tactical_moves(position, piece):
+    """
+    Classify the root moves of a Position for piece (PLAYER or AI).
+
+    Returns (column, reason, moves). column is set when the move is forced,
+    with reason 'win', 'block' or 'only_safe'; otherwise it is None and moves
+    lists the columns still worth searching, in center-out order. Moves that
+    hand the opponent a win are only dropped if something else remains.
+    """
+    moves = [c for c in position.geometry.center_order if position.can_play(c)]
+
+    wins = _winning_columns(position, piece, moves)
+    if wins:
+        return wins[0], 'win', [wins[0]]
+
+    opponent = PLAYER if piece == AI else AI
+    threats = _winning_columns(position, opponent, moves)
+    if threats:
+        # With two or more threats the game is lost; block one anyway
+        return threats[0], 'block', [threats[0]]
+
+    safe = [c for c in moves if not _gives_win_above(position, piece, c)]
+    if len(safe) == 1:
+        return safe[0], 'only_safe', safe
+    if not safe:
+        return None, None, moves
+    return None, None, safe
@@ -0,0 +1,80 @@
+"""
+Connect-4 Transposition Table
+Fixed-size, Zobrist-keyed cache of search results so that a position reached
+through different move orders is only searched once per depth.
+"""
+
+# Bound flags stored with each entry
+EXACT = 0
+LOWER = 1  # value is a lower bound (search failed high)
+UPPER = 2  # value is an upper bound (search failed low)
+
+# Entry layout: (key, depth, flag, value, move, generation)
+KEY, DEPTH, FLAG, VALUE, MOVE, GENERATION = range(6)
+
+
+class TranspositionTable:
+    """
+    Bounded transposition table.
+
+    Entries live in a preallocated list indexed by ``key % size``, so memory
+    is capped at ``size`` entries. On a collision the new entry replaces the
+    old one if the slot holds the same position, an entry left over from an
+    earlier search, or a result searched no deeper than the new one.
+    """
+
+    def __init__(self, size=1 << 18):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """Age existing entries so they can be replaced by the coming search."""
+        self.generation += 1
+
+    def probe(self, key):
+        """Return the entry tuple stored for key, or None."""
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[KEY] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def peek(self, key):
+        """Like probe(), but without touching the hit/miss counters."""
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[KEY] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        index = key % self.size
+        old = self.slots[index]
+        if old is not None:
+            if (old[KEY] != key and old[GENERATION] == self.generation
+                    and old[DEPTH] > depth):
+                return
+            if old[KEY] != key:
+                self.overwrites += 1
+        self.slots[index] = (key, depth, flag, value, move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+        }
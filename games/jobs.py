@@ -0,0 +1,122 @@
+"""
+Background AI Move Jobs
+Runs slow AI searches on a bounded executor so request workers stay free.
+A client submits a job, gets its ID back, and collects the result by
+polling, long-polling or server-sent events.
+"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional
+
+# Search threads shared by every game
+MAX_WORKERS = 2
+
+# Jobs allowed to wait or run at once; submissions beyond this are refused
+MAX_PENDING = 32
+
+# Seconds a finished job is kept for its result to be collected
+RESULT_TTL = 600
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running."""
+
+
+class Job:
+    """One submitted AI search and its outcome."""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict:
+        data = {'job_id': self.id, 'kind': self.kind, 'status': self.status}
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'error':
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    """Bounded executor plus a registry of recent jobs."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS,
+                 max_pending: int = MAX_PENDING,
+                 result_ttl: float = RESULT_TTL):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='ai-job')
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.jobs: Dict[str, Job] = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> Job:
+        """Queue fn(*args, **kwargs). Raises JobQueueFull when saturated."""
+        job = Job(kind)
+        with self.lock:
+            self._prune()
+            if self.pending >= self.max_pending:
+                raise JobQueueFull('Too many AI moves in progress, try again shortly')
+            self.pending += 1
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs) -> None:
+        job.status = 'running'
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'error'
+        finally:
+            job.finished_at = time.monotonic()
+            with self.lock:
+                self.pending -= 1
+            job.done.set()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.result_ttl
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[Job]:
+        """Look up a job, optionally waiting up to `wait` seconds for it to finish."""
+        job = self.jobs.get(job_id)
+        if job is not None and wait > 0:
+            job.done.wait(wait)
+        return job
+
+    def stream(self, job: Job, timeout: float = 60,
+               interval: float = 0.25) -> Iterator[str]:
+        """Server-sent events: one 'status' event per change, ending when the job ends."""
+        deadline = time.monotonic() + timeout
+        last = None
+        while True:
+            if job.status != last:
+                last = job.status
+                yield f'event: status\ndata: {json.dumps(job.to_dict())}\n\n'
+            if job.done.is_set() or time.monotonic() >= deadline:
+                return
+            job.done.wait(interval)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {'pending': self.pending, 'tracked': len(self.jobs)}
+
+
+job_manager = JobManager()
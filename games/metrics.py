@@ -0,0 +1,229 @@
+"""
+Prometheus Metrics
+Small thread-safe gauges and histograms rendered in the Prometheus
+text exposition format, plus the Flask hooks that feed them. Each update is
+one lock acquisition and a few integer operations, so they stay on in
+production.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# AI think-time buckets in seconds
+THINK_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# Session payload buckets in bytes; browsers cap cookies at about 4 KB
+PAYLOAD_BUCKETS = (256, 512, 1024, 2048, 3072, 4096, 8192)
+
+# Difficulty label values; anything else a client sends is counted as 'other'
+# so requests cannot create new series
+DIFFICULTY_LABELS = ('easy', 'medium', 'hard')
+
+# What an AI call was for: a move the user is waiting on, a move answered
+# from a cache without searching, or a background ponder search
+SEARCH_KINDS = ('move', 'cached', 'ponder')
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}',
+                f'# TYPE {self.name} {self.kind}']
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, such as searches in progress."""
+
+    kind = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    @contextmanager
+    def track(self, *labels) -> Iterator[None]:
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+    def render(self) -> List[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return self.header() + [
+            f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+            for labels, value in values]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (last is +Inf), sum]
+        self.series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        with self.lock:
+            series = sorted((labels, (counts[:], total))
+                            for labels, (counts, total) in self.series.items())
+        lines = self.header()
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket'
+                             f'{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_latency = registry.register(Histogram(
+    'http_request_duration_seconds', 'Request latency by route.',
+    ('route', 'method', 'status'), LATENCY_BUCKETS))
+
+ai_think_time = registry.register(Histogram(
+    'ai_think_seconds', 'Time the AI spent choosing a move, by what the move was for.',
+    ('game', 'difficulty', 'kind'), THINK_BUCKETS))
+
+searches_in_progress = registry.register(Gauge(
+    'ai_searches_in_progress', 'AI searches running right now.', ('game',)))
+
+session_payload = registry.register(Histogram(
+    'session_payload_bytes', 'Serialized size of sessions written back to the client.',
+    ('blueprint',), PAYLOAD_BUCKETS))
+
+
+class AISearch:
+    """Labels of a search being timed; set kind once the search knows it."""
+
+    __slots__ = ('kind',)
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+
+@contextmanager
+def ai_search(game: str, difficulty: str, kind: str = 'move') -> Iterator[AISearch]:
+    """
+    Count a search as in progress and record its think time. kind is one of
+    SEARCH_KINDS; the search may change it on the yielded AISearch, e.g. to
+    'cached' once it finds its answer in a cache.
+    """
+    if difficulty not in DIFFICULTY_LABELS:
+        difficulty = 'other'
+    search = AISearch(kind)
+    start = time.perf_counter()
+    with searches_in_progress.track(game):
+        try:
+            yield search
+        finally:
+            ai_think_time.observe(time.perf_counter() - start,
+                                  game, difficulty, search.kind)
+
+
+def init_app(app) -> None:
+    """Time every request, size written sessions and serve GET /metrics."""
+    from flask import Response, g, request, session
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            # The URL rule keeps label values bounded, e.g. /api/jobs/<job_id>
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            request_latency.observe(time.perf_counter() - start, route,
+                                    request.method, str(response.status_code))
+        if session.modified:
+            payload = app.session_interface.serializer.dumps(dict(session))
+            session_payload.observe(len(payload), request.blueprint or 'app')
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(),
+                        mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,109 @@
+"""
+Search Statistics
+Opt-in counters for a single AI search, plus process-wide totals per game
+and difficulty. A search only records anything when it is handed a
+SearchStats; otherwise it skips the bookkeeping entirely.
+"""
+
+import threading
+from typing import Dict, Optional
+
+
+class SearchStats:
+    """Counters for one search."""
+
+    __slots__ = ('nodes', 'roots', 'leaves', 'expanded', 'cutoffs', 'max_depth',
+                 'cache_probes', 'cache_hits', 'elapsed', 'root_ply')
+
+    def __init__(self):
+        self.nodes = 0          # positions visited
+        self.roots = 0          # visits to the root (one per deepening pass)
+        self.leaves = 0         # positions scored by the evaluation
+        self.expanded = 0       # positions whose moves were searched
+        self.cutoffs = 0        # alpha-beta cutoffs
+        self.max_depth = 0      # deepest ply below the root
+        self.cache_probes = 0   # transposition table lookups
+        self.cache_hits = 0
+        self.elapsed = 0.0      # seconds
+        # Move count of the root position, for searches that only know
+        # the absolute ply
+        self.root_ply = 0
+
+    def visit(self, ply: int) -> None:
+        self.nodes += 1
+        if ply == 0:
+            self.roots += 1
+        elif ply > self.max_depth:
+            self.max_depth = ply
+
+    def branching_factor(self) -> float:
+        """Average number of moves searched per expanded position."""
+        if not self.expanded:
+            return 0.0
+        # Every node except the roots is a child of an expanded position
+        return (self.nodes - self.roots) / self.expanded
+
+    def to_dict(self) -> Dict:
+        return {
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'cutoffs': self.cutoffs,
+            'max_depth': self.max_depth,
+            'branching_factor': round(self.branching_factor(), 2),
+            'cache_probes': self.cache_probes,
+            'cache_hits': self.cache_hits,
+            'elapsed_ms': round(1000 * self.elapsed, 3),
+            'nodes_per_second': round(self.nodes / self.elapsed) if self.elapsed else 0,
+        }
+
+
+class StatsRegistry:
+    """Thread-safe totals of recorded searches, per game and difficulty."""
+
+    FIELDS = ('nodes', 'roots', 'leaves', 'expanded', 'cutoffs', 'cache_probes',
+              'cache_hits', 'elapsed')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals: Dict[tuple, Dict] = {}
+
+    def record(self, game: str, difficulty: str, stats: SearchStats) -> None:
+        with self.lock:
+            totals = self.totals.setdefault((game, difficulty), dict(
+                {field: 0 for field in self.FIELDS}, searches=0, max_depth=0))
+            totals['searches'] += 1
+            for field in self.FIELDS:
+                totals[field] += getattr(stats, field)
+            totals['max_depth'] = max(totals['max_depth'], stats.max_depth)
+
+    def summary(self, game: Optional[str] = None) -> Dict:
+        """Totals and per-search averages, keyed by difficulty (and game if not given)."""
+        with self.lock:
+            items = [(key, dict(totals)) for key, totals in self.totals.items()]
+        summary = {}
+        for (key_game, difficulty), totals in items:
+            if game is not None and key_game != game:
+                continue
+            searches = totals['searches']
+            summary_key = difficulty if game is not None else f'{key_game}:{difficulty}'
+            summary[summary_key] = {
+                'searches': searches,
+                'avg_nodes': totals['nodes'] / searches,
+                'avg_elapsed_ms': 1000 * totals['elapsed'] / searches,
+                'max_depth': totals['max_depth'],
+                'branching_factor': ((totals['nodes'] - totals['roots']) / totals['expanded']
+                                     if totals['expanded'] else 0.0),
+                'cutoffs': totals['cutoffs'],
+                'cache_hit_rate': (totals['cache_hits'] / totals['cache_probes']
+                                   if totals['cache_probes'] else 0.0),
+                'nodes_per_second': (totals['nodes'] / totals['elapsed']
+                                     if totals['elapsed'] else 0.0),
+            }
+        return summary
+
+    def clear(self) -> None:
+        with self.lock:
+            self.totals.clear()
+
+
+search_stats = StatsRegistry()
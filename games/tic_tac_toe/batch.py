@@ -0,0 +1,34 @@
+"""
+Tic-Tac-Toe Batch Evaluation
+Vectorized winner checks and evaluation over many boards at once. Boards
+are stacked into an (N, 3, 3) array holding 'X', 'O' and '' (or None) cells.
+Results match TicTacToeEngine._check_winner and evaluate exactly.
+"""
+
+import numpy as np
+
+# The eight lines as flat cell indices, in the order _check_winner scans them
+LINES = np.array([
+    [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
+    [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
+    [0, 4, 8], [2, 4, 6],             # diagonals
+])
+
+
+def batch_check_winner(boards) -> np.ndarray:
+    """Object array of 'X', 'O' or None, one per board."""
+    flat = np.asarray(boards, dtype=object).reshape(-1, 9)
+    x_lines = (flat == 'X')[:, LINES].all(axis=2)
+    o_lines = (flat == 'O')[:, LINES].all(axis=2)
+    # 1 for an X line, 2 for an O line; the first complete line wins
+    codes = x_lines.astype(np.int8) + o_lines.astype(np.int8) * 2
+    first = (codes > 0).argmax(axis=1)
+    winner_codes = codes[np.arange(len(codes)), first]
+    return np.array([None, 'X', 'O'], dtype=object)[winner_codes]
+
+
+def batch_evaluate(boards, player: str) -> np.ndarray:
+    """Integer array: +10 if player won, -10 if the opponent won, else 0."""
+    winners = batch_check_winner(boards)
+    return np.where(winners == player, 10,
+                    np.where(winners == None, 0, -10))  # noqa: E711
@@ -1,25 +1,102 @@
 """
 Tic-Tac-Toe Game Engine
 Handles game state, rules validation, and win condition checking.
+The board is two 9-bit masks, one per player, with cell (row, col) at bit
+row * 3 + col.
 """
 
-from typing import List, Optional, Tuple, Dict
-import copy
+from typing import List, Optional, Sequence, Tuple, Dict
+from .symmetry import canonical
+
+# Every cell occupied
+FULL = 0x1FF
+
+# The eight lines as bit masks: rows, columns, then diagonals
+LINE_MASKS = tuple(sum(1 << i for i in line) for line in (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6),
+))
+
+# Lines through each cell
+CELL_LINES = tuple(tuple(mask for mask in LINE_MASKS if mask >> i & 1)
+                   for i in range(9))
+
+# Free cells as (row, col) in row-major order, for every occupancy mask
+_AVAILABLE = tuple(tuple(divmod(i, 3) for i in range(9) if not occupied >> i & 1)
+                   for occupied in range(FULL + 1))
+
+
+def _masks(board: Sequence[Sequence[Optional[str]]]) -> Tuple[int, int]:
+    """X and O masks of a 3x3 board whose empty cells are '' or None."""
+    x = o = 0
+    for i, cell in enumerate(cell for row in board for cell in row):
+        if cell == 'X':
+            x |= 1 << i
+        elif cell == 'O':
+            o |= 1 << i
+    return x, o
+
+
+def _winner(x: int, o: int) -> Optional[str]:
+    for mask in LINE_MASKS:
+        if x & mask == mask:
+            return 'X'
+        if o & mask == mask:
+            return 'O'
+    return None
+
+
+def check_winner(board: Sequence[Sequence[Optional[str]]]) -> Optional[str]:
+    """'X' or 'O' if that player has a line, else None. Empty cells may be '' or None."""
+    return _winner(*_masks(board))
+
+
+def is_board_full(board: Sequence[Sequence[Optional[str]]]) -> bool:
+    """Check if every cell is taken. Empty cells may be '' or None."""
+    x, o = _masks(board)
+    return x | o == FULL
+
 
 class TicTacToeEngine:
     """Main game engine for Tic-Tac-Toe logic."""
     
+    __slots__ = ('x', 'o', 'current_player', 'game_over', 'winner')
+    
     def __init__(self):
         """Initialize a new game."""
         self.reset_game()
     
+    @classmethod
+    def from_board(cls, board: Sequence[Sequence[Optional[str]]],
+                   current_player: str = 'X') -> 'TicTacToeEngine':
+        """Engine for a board whose empty cells are '' or None."""
+        engine = cls()
+        engine.board = board
+        engine.current_player = current_player
+        engine.winner = engine._check_winner()
+        engine.game_over = engine.winner is not None or engine._is_board_full()
+        return engine
+    
     def reset_game(self) -> None:
         """Reset the game to initial state."""
-        self.board = [['' for _ in range(3)] for _ in range(3)]
+        self.x = 0
+        self.o = 0
         self.current_player = 'X'  # X always starts
         self.game_over = False
         self.winner = None
     
+    @property
+    def board(self) -> List[List[str]]:
+        """The board as rows of 'X', 'O' and '' (a fresh list on every access)."""
+        x, o = self.x, self.o
+        return [['X' if x >> i & 1 else 'O' if o >> i & 1 else ''
+                 for i in range(row, row + 3)] for row in (0, 3, 6)]
+    
+    @board.setter
+    def board(self, board: Sequence[Sequence[Optional[str]]]) -> None:
+        self.x, self.o = _masks(board)
+    
     def get_state(self) -> Dict:
         """Get current game state as dictionary."""
         return {
@@ -42,7 +119,7 @@ class TicTacToeEngine:
             return False
         if row < 0 or row >= 3 or col < 0 or col >= 3:
             return False
-        return self.board[row][col] == ''
+        return not (self.x | self.o) >> (row * 3 + col) & 1
     
     def make_move(self, row: int, col: int, player: str = None) -> bool:
         """
@@ -51,11 +128,14 @@ class TicTacToeEngine:
         """
         if player is None:
             player = self.current_player
-            
+        
         if not self.is_valid_move(row, col):
             return False
         
-        self.board[row][col] = player
+        if player == 'X':
+            self.x |= 1 << (row * 3 + col)
+        else:
+            self.o |= 1 << (row * 3 + col)
         
         # Check for win or draw
         self.winner = self._check_winner()
@@ -67,43 +147,46 @@ class TicTacToeEngine:
         
         return True
     
+    def undo_move(self, row: int, col: int) -> None:
+        """
+        Take back the last move, which must have been made at (row, col).
+        Lets the search explore moves in place instead of copying the engine.
+        """
+        keep = ~(1 << (row * 3 + col))
+        self.x &= keep
+        self.o &= keep
+        if self.game_over:
+            # The move ended the game, so the turn was never switched
+            self.game_over = False
+            self.winner = None
+        else:
+            self.current_player = 'O' if self.current_player == 'X' else 'X'
+    
+    def completes_line(self, row: int, col: int, player: str) -> bool:
+        """Whether player taking the empty cell (row, col) would make a line."""
+        i = row * 3 + col
+        mask = (self.x if player == 'X' else self.o) | 1 << i
+        return any(mask & line == line for line in CELL_LINES[i])
+    
+    def canonical(self) -> Tuple[int, int]:
+        """
+        (key, transform) of the board's symmetry class; see
+        symmetry.canonical. Positions equal up to rotation or reflection
+        share a key.
+        """
+        return canonical(self.x, self.o)
+    
     def get_available_moves(self) -> List[Tuple[int, int]]:
         """Get list of available moves as (row, col) tuples."""
-        moves = []
-        for row in range(3):
-            for col in range(3):
-                if self.board[row][col] == '':
-                    moves.append((row, col))
-        return moves
+        return list(_AVAILABLE[self.x | self.o])
     
     def _check_winner(self) -> Optional[str]:
         """Check if there's a winner. Returns 'X', 'O', or None."""
-        # Check rows
-        for row in self.board:
-            if row[0] == row[1] == row[2] != '':
-                return row[0]
-        
-        # Check columns
-        for col in range(3):
-            if self.board[0][col] == self.board[1][col] == self.board[2][col] != '':
-                return self.board[0][col]
-        
-        # Check diagonals
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] != '':
-            return self.board[0][0]
-        
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] != '':
-            return self.board[0][2]
-        
-        return None
+        return _winner(self.x, self.o)
     
     def _is_board_full(self) -> bool:
         """Check if the board is full."""
-        for row in self.board:
-            for cell in row:
-                if cell == '':
-                    return False
-        return True
+        return self.x | self.o == FULL
     
     def is_terminal(self) -> bool:
         """Check if the game is in a terminal state."""
@@ -122,10 +205,11 @@ class TicTacToeEngine:
         return 0  # Draw or ongoing game
     
     def copy(self):
-        """Create a deep copy of the game engine."""
-        new_engine = TicTacToeEngine()
-        new_engine.board = copy.deepcopy(self.board)
+        """Create an independent copy of the game engine."""
+        new_engine = object.__new__(type(self))
+        new_engine.x = self.x
+        new_engine.o = self.o
         new_engine.current_player = self.current_player
         new_engine.game_over = self.game_over
         new_engine.winner = self.winner
-        return new_engine
\ No newline at end of file
+        return new_engine
@@ -0,0 +1,482 @@
+"""
+Gomoku-Scale K-in-a-Row
+N x N boards where k stones in a row win, 15x15 five-in-a-row by default.
+The 3x3 engine's full-width search cannot cope with boards this size, so
+this engine only considers cells near existing stones, keeps a threat score
+over every k-cell window up to date as stones are placed, checks for wins
+only through the last stone, and searches to a wall-clock budget.
+"""
+
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..metrics import ai_search
+from ..search_stats import SearchStats
+from ..tracing import Trace
+
+DEFAULT_SIZE = 15
+DEFAULT_CONNECT = 5
+MIN_SIZE = 5
+MAX_SIZE = 19
+MIN_CONNECT = 3
+
+# Empty cells within this many steps of a stone are candidate moves
+NEIGHBOURHOOD = 2
+
+# Candidate moves searched at each node, best first by their threat score
+BRANCHING = 10
+
+# Search depth, wall-clock budget in seconds and random-move chance by
+# difficulty. The search deepens until the depth or the budget runs out.
+DEPTH_MAP = {
+    'easy': 1,
+    'medium': 2,
+    'hard': 6
+}
+TIME_BUDGETS = {
+    'easy': 0.2,
+    'medium': 0.5,
+    'hard': 1.0
+}
+RANDOMNESS = {
+    'easy': 0.3,
+    'medium': 0.1,
+    'hard': 0.0
+}
+
+# Longest budget a request may ask for
+MAX_TIME_BUDGET = 5.0
+
+# Score of a completed line; every other score stays far below half of it
+WIN_SCORE = 10 ** 30
+
+OTHER = {'X': 'O', 'O': 'X'}
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search once the move deadline has passed."""
+
+
+class GomokuGeometry:
+    """Window and neighbourhood tables for one board size and win length."""
+
+    def __init__(self, size: int, k: int):
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.center = (size // 2) * size + size // 2
+
+        # Every k-cell window as a tuple of cell indices: rows, columns and
+        # both diagonals
+        windows = []
+        for r in range(size):
+            for c in range(size):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_r, end_c = r + dr * (k - 1), c + dc * (k - 1)
+                    if 0 <= end_r < size and 0 <= end_c < size:
+                        windows.append(tuple((r + dr * i) * size + c + dc * i
+                                             for i in range(k)))
+        self.windows = tuple(windows)
+        # Window ids through each cell
+        cell_windows = [[] for _ in range(self.cells)]
+        for w, window in enumerate(windows):
+            for index in window:
+                cell_windows[index].append(w)
+        self.cell_windows = tuple(tuple(ws) for ws in cell_windows)
+
+        # A window's contents are encoded as x_count * (k + 1) + o_count,
+        # so placing a stone is one integer addition
+        self.code_step = {'X': k + 1, 'O': 1}
+        self.win_codes = {'X': k * (k + 1), 'O': k}
+        # Threat score of every window code from X's side: a window only
+        # one player has stones in is worth ten times more per stone
+        scores = [0] * ((k + 1) * (k + 1))
+        for count in range(1, k + 1):
+            threat = WIN_SCORE if count == k else 10 ** (count - 1)
+            scores[count * (k + 1)] = threat
+            scores[count] = -threat
+        self.window_scores = tuple(scores)
+
+        self.neighbours = tuple(
+            tuple(nr * size + nc
+                  for nr in range(max(0, r - NEIGHBOURHOOD), min(size, r + NEIGHBOURHOOD + 1))
+                  for nc in range(max(0, c - NEIGHBOURHOOD), min(size, c + NEIGHBOURHOOD + 1))
+                  if (nr, nc) != (r, c))
+            for r, c in (divmod(i, size) for i in range(self.cells)))
+
+
+_geometries: Dict[Tuple[int, int], GomokuGeometry] = {}
+
+
+def get_geometry(size: int = DEFAULT_SIZE, k: int = DEFAULT_CONNECT) -> GomokuGeometry:
+    geometry = _geometries.get((size, k))
+    if geometry is None:
+        if not MIN_CONNECT <= k <= size:
+            raise ValueError(f'Cannot connect {k} on a {size}x{size} board')
+        geometry = _geometries.setdefault((size, k), GomokuGeometry(size, k))
+    return geometry
+
+
+def winner_at(board: Sequence[Sequence[Optional[str]]], row: int, col: int,
+              k: int) -> Optional[str]:
+    """The stone at (row, col) if it completes k in a row through that cell."""
+    player = board[row][col]
+    if not player:
+        return None
+    size = len(board)
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        run = 1
+        for sign in (1, -1):
+            r, c = row + sign * dr, col + sign * dc
+            while 0 <= r < size and 0 <= c < size and board[r][c] == player:
+                run += 1
+                r, c = r + sign * dr, c + sign * dc
+        if run >= k:
+            return player
+    return None
+
+
+class GomokuEngine:
+    """N x N k-in-a-row game with incrementally maintained threat scores."""
+
+    __slots__ = ('geometry', 'cells', 'codes', 'score', 'near', 'stones',
+                 'current_player', 'game_over', 'winner')
+
+    def __init__(self, size: int = DEFAULT_SIZE, k: int = DEFAULT_CONNECT):
+        self.geometry = get_geometry(size, k)
+        self.reset_game()
+
+    @classmethod
+    def from_board(cls, board: Sequence[Sequence[Optional[str]]], k: int,
+                   current_player: str = 'X') -> 'GomokuEngine':
+        """Engine for a square board whose empty cells are '' or None."""
+        engine = cls(len(board), k)
+        for index, cell in enumerate(cell for row in board for cell in row):
+            if cell in OTHER:
+                engine._play(index, cell)
+        engine.current_player = current_player
+        engine.game_over = engine.winner is not None or engine.stones == engine.geometry.cells
+        return engine
+
+    def reset_game(self) -> None:
+        """Reset the game to initial state."""
+        g = self.geometry
+        self.cells = [''] * g.cells
+        self.codes = [0] * len(g.windows)
+        # Sum of window scores from X's side
+        self.score = 0
+        # Stones within NEIGHBOURHOOD of each cell
+        self.near = [0] * g.cells
+        self.stones = 0
+        self.current_player = 'X'
+        self.game_over = False
+        self.winner = None
+
+    @property
+    def size(self) -> int:
+        return self.geometry.size
+
+    @property
+    def k(self) -> int:
+        return self.geometry.k
+
+    @property
+    def board(self) -> List[List[str]]:
+        """The board as rows of 'X', 'O' and ''."""
+        size = self.geometry.size
+        return [self.cells[r * size:(r + 1) * size] for r in range(size)]
+
+    def get_state(self) -> Dict:
+        """Get current game state as dictionary."""
+        return {
+            'board': self.board,
+            'current_player': self.current_player,
+            'game_over': self.game_over,
+            'winner': self.winner,
+            'connect': self.geometry.k
+        }
+
+    def is_valid_move(self, row: int, col: int) -> bool:
+        """Check if a move is valid."""
+        size = self.geometry.size
+        if self.game_over or not (0 <= row < size and 0 <= col < size):
+            return False
+        return not self.cells[row * size + col]
+
+    def make_move(self, row: int, col: int, player: str = None) -> bool:
+        """
+        Make a move on the board.
+        Returns True if move was successful, False otherwise.
+        """
+        if player is None:
+            player = self.current_player
+        if not self.is_valid_move(row, col):
+            return False
+        self._play(row * self.geometry.size + col, player)
+        if self.winner or self.stones == self.geometry.cells:
+            self.game_over = True
+        else:
+            self.current_player = OTHER[self.current_player]
+        return True
+
+    def undo_move(self, row: int, col: int) -> None:
+        """Take back the last move, which must have been made at (row, col)."""
+        self._undo(row * self.geometry.size + col)
+        if self.game_over:
+            # The move ended the game, so the turn was never switched
+            self.game_over = False
+        else:
+            self.current_player = OTHER[self.current_player]
+
+    def _play(self, index: int, player: str) -> None:
+        """Place a stone, rescoring only the windows through its cell."""
+        g = self.geometry
+        codes = self.codes
+        scores = g.window_scores
+        step = g.code_step[player]
+        win_code = g.win_codes[player]
+        score = self.score
+        for w in g.cell_windows[index]:
+            old = codes[w]
+            new = codes[w] = old + step
+            score += scores[new] - scores[old]
+            if new == win_code:
+                self.winner = player
+        self.score = score
+        self.cells[index] = player
+        self.stones += 1
+        near = self.near
+        for j in g.neighbours[index]:
+            near[j] += 1
+
+    def _undo(self, index: int) -> None:
+        g = self.geometry
+        player = self.cells[index]
+        codes = self.codes
+        scores = g.window_scores
+        step = g.code_step[player]
+        score = self.score
+        for w in g.cell_windows[index]:
+            old = codes[w]
+            new = codes[w] = old - step
+            score += scores[new] - scores[old]
+        self.score = score
+        self.cells[index] = ''
+        self.stones -= 1
+        # Moves are undone in reverse order, so no earlier line was complete
+        self.winner = None
+        near = self.near
+        for j in g.neighbours[index]:
+            near[j] -= 1
+
+    def get_available_moves(self) -> List[Tuple[int, int]]:
+        """Get list of available moves as (row, col) tuples."""
+        size = self.geometry.size
+        return [divmod(i, size) for i, cell in enumerate(self.cells) if not cell]
+
+    def candidate_moves(self) -> List[Tuple[int, int]]:
+        """Empty cells near a stone, or the center on an empty board."""
+        size = self.geometry.size
+        return [divmod(i, size) for _, i in self._scored_candidates(self.current_player)]
+
+    def _scored_candidates(self, player: str) -> List[Tuple[int, int]]:
+        """
+        (gain, index) for every candidate cell, best first, where gain is
+        how much playing there changes the threat score from player's side:
+        building its own lines and blocking the opponent's both count.
+        """
+        g = self.geometry
+        if not self.stones:
+            return [(0, g.center)]
+        codes = self.codes
+        scores = g.window_scores
+        cell_windows = g.cell_windows
+        step = g.code_step[player]
+        sign = 1 if player == 'X' else -1
+        cells = self.cells
+        scored = []
+        for index, count in enumerate(self.near):
+            if count and not cells[index]:
+                gain = 0
+                for w in cell_windows[index]:
+                    code = codes[w]
+                    gain += scores[code + step] - scores[code]
+                scored.append((sign * gain, index))
+        scored.sort(key=lambda move: -move[0])
+        return scored
+
+    def is_terminal(self) -> bool:
+        """Check if the game is in a terminal state."""
+        return self.game_over
+
+    def evaluate(self, player: str) -> int:
+        """Threat score from player's side; WIN_SCORE or -WIN_SCORE once won."""
+        if self.winner is not None:
+            return WIN_SCORE if self.winner == player else -WIN_SCORE
+        return self.score if player == 'X' else -self.score
+
+    def copy(self) -> 'GomokuEngine':
+        engine = object.__new__(GomokuEngine)
+        engine.geometry = self.geometry
+        engine.cells = self.cells[:]
+        engine.codes = self.codes[:]
+        engine.score = self.score
+        engine.near = self.near[:]
+        engine.stones = self.stones
+        engine.current_player = self.current_player
+        engine.game_over = self.game_over
+        engine.winner = self.winner
+        return engine
+
+
+class GomokuAI:
+    """
+    Iterative-deepening alpha-beta over the best few candidate moves. It
+    always has a move ready, the best candidate by threat score, and returns
+    the deepest completed search's choice once the budget is spent.
+    """
+
+    def __init__(self, difficulty: str = 'hard', time_budget: Optional[float] = None):
+        self.difficulty = difficulty.lower()
+        self.max_depth = DEPTH_MAP.get(self.difficulty, DEPTH_MAP['medium'])
+        self.randomness = RANDOMNESS.get(self.difficulty, 0.0)
+        if time_budget is None:
+            time_budget = TIME_BUDGETS.get(self.difficulty, TIME_BUDGETS['medium'])
+        self.time_budget = min(time_budget, MAX_TIME_BUDGET)
+
+    def get_best_move(self, engine: GomokuEngine, ai_player: str,
+                      stats: Optional[SearchStats] = None,
+                      trace: Optional[Trace] = None) -> Optional[Tuple[int, int]]:
+        """
+        Get the best move for the AI player. Pass a SearchStats to have the
+        search counted and timed, and a Trace to have its decisions recorded.
+        """
+        start = time.perf_counter()
+        try:
+            with ai_search('gomoku', self.difficulty):
+                return self._choose_move(engine.copy(), ai_player, stats, trace)
+        finally:
+            if stats is not None:
+                stats.elapsed = time.perf_counter() - start
+
+    def _choose_move(self, engine: GomokuEngine, ai_player: str,
+                     stats: Optional[SearchStats],
+                     trace: Optional[Trace]) -> Optional[Tuple[int, int]]:
+        deadline = time.monotonic() + self.time_budget
+        size = engine.geometry.size
+        moves = engine._scored_candidates(ai_player)
+        if trace is not None:
+            trace.event('search', difficulty=self.difficulty, player=ai_player,
+                        max_depth=self.max_depth, time_budget=self.time_budget,
+                        candidates=len(moves))
+        if not moves or engine.game_over:
+            return None
+
+        random_roll = random.random()
+        if random_roll < self.randomness:
+            index = random.choice(moves[:BRANCHING])[1]
+            if trace is not None:
+                trace.event('random_move', roll=random_roll, move=divmod(index, size))
+            return divmod(index, size)
+
+        root_moves = [index for _, index in moves[:BRANCHING]]
+        best = root_moves[0]
+        # A lone candidate (the opening move) needs no search
+        max_depth = self.max_depth if len(root_moves) > 1 else 0
+        for depth in range(1, max_depth + 1):
+            try:
+                value, move = self._search_root(engine, root_moves, depth,
+                                                ai_player, deadline, stats)
+            except SearchTimeout:
+                if trace is not None:
+                    trace.event('timeout', depth=depth)
+                break
+            best = move
+            if trace is not None:
+                trace.event('depth', depth=depth, move=divmod(move, size), value=value)
+            if abs(value) >= WIN_SCORE // 2:
+                break
+            # Search the best move first on the next pass
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+
+        if trace is not None:
+            trace.event('choice', move=divmod(best, size))
+        return divmod(best, size)
+
+    def _search_root(self, engine: GomokuEngine, root_moves: List[int], depth: int,
+                     player: str, deadline: float,
+                     stats: Optional[SearchStats]) -> Tuple[int, int]:
+        if stats is not None:
+            stats.visit(0)
+            stats.expanded += 1
+        alpha, beta = -WIN_SCORE * 2, WIN_SCORE * 2
+        best_value, best_move = None, root_moves[0]
+        for index in root_moves:
+            engine._play(index, player)
+            try:
+                value = -self._negamax(engine, depth - 1, -beta, -alpha,
+                                       OTHER[player], 1, deadline, stats)
+            finally:
+                engine._undo(index)
+            if best_value is None or value > best_value:
+                best_value, best_move = value, index
+            alpha = max(alpha, value)
+        return best_value, best_move
+
+    def _negamax(self, engine: GomokuEngine, depth: int, alpha: int, beta: int,
+                 player: str, ply: int, deadline: float,
+                 stats: Optional[SearchStats]) -> int:
+        """Value for player, to move, with depth plies left."""
+        if time.monotonic() >= deadline:
+            raise SearchTimeout()
+        if stats is not None:
+            stats.visit(ply)
+
+        if engine.winner is not None:
+            # The opponent's last stone won; sooner losses score lower
+            if stats is not None:
+                stats.leaves += 1
+            return -(WIN_SCORE - ply)
+        if engine.stones == engine.geometry.cells:
+            if stats is not None:
+                stats.leaves += 1
+            return 0
+        sign = 1 if player == 'X' else -1
+        if depth == 0:
+            if stats is not None:
+                stats.leaves += 1
+            return sign * engine.score
+
+        moves = engine._scored_candidates(player)
+        if depth == 1:
+            # Scoring the candidates already gave every child's static
+            # value, so the last ply needs no moves played
+            if stats is not None:
+                stats.leaves += 1
+            gain = moves[0][0]
+            if gain >= WIN_SCORE // 2:
+                return WIN_SCORE - ply - 1
+            return sign * engine.score + gain
+
+        if stats is not None:
+            stats.expanded += 1
+        best = -WIN_SCORE * 2
+        other = OTHER[player]
+        for _, index in moves[:BRANCHING]:
+            engine._play(index, player)
+            try:
+                value = -self._negamax(engine, depth - 1, -beta, -alpha,
+                                       other, ply + 1, deadline, stats)
+            finally:
+                engine._undo(index)
+            if value > best:
+                best = value
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                break
+        return best
@@ -4,8 +4,13 @@ Implements AI decision making with configurable difficulty levels.
 """
 
 import random
+import time
 from typing import Tuple, Optional
+from ..metrics import ai_search
+from ..search_stats import SearchStats
+from ..tracing import Trace
 from .engine import TicTacToeEngine
+from .perfect_play import perfect_play
 
 class MinimaxAI:
     """AI player using minimax algorithm with alpha-beta pruning."""
@@ -39,129 +44,143 @@ class MinimaxAI:
         else:  # hard
             return 0.0  # No randomness
     
-    def get_best_move(self, engine: TicTacToeEngine, ai_player: str) -> Optional[Tuple[int, int]]:
-        """Get the best move for the AI player."""
+    def get_best_move(self, engine: TicTacToeEngine, ai_player: str,
+                      stats: Optional[SearchStats] = None,
+                      trace: Optional[Trace] = None) -> Optional[Tuple[int, int]]:
+        """
+        Get the best move for the AI player. Pass a SearchStats to have the
+        search counted and timed, and a Trace to have its decisions recorded.
+        """
+        start = time.perf_counter()
+        try:
+            with ai_search('tic_tac_toe', self.difficulty):
+                return self._choose_move(engine, ai_player, stats, trace)
+        finally:
+            if stats is not None:
+                stats.elapsed = time.perf_counter() - start
+    
+    def _choose_move(self, engine: TicTacToeEngine, ai_player: str,
+                     stats: Optional[SearchStats],
+                     trace: Optional[Trace]) -> Optional[Tuple[int, int]]:
         available_moves = engine.get_available_moves()
-        
-        print(f"\n=== DIFFICULTY TEST DEBUG ===")
-        print(f"🎯 Difficulty: {self.difficulty.upper()}")
-        print(f"🔍 Max search depth: {self.max_depth}")
-        print(f"🎲 Randomness factor: {self.randomness * 100}%")
-        print(f"AI player: {ai_player}")
-        print(f"Available moves: {available_moves}")
-        print(f"Current board:")
-        for i, row in enumerate(engine.board):
-            print(f"  Row {i}: {row}")
+        if trace is not None:
+            trace.event('search', difficulty=self.difficulty, player=ai_player,
+                        max_depth=self.max_depth, randomness=self.randomness,
+                        board=engine.board,
+                        moves=available_moves)
         
         if not available_moves:
-            print("No available moves!")
             return None
         
         # Check for randomness (Easy/Medium only)
         random_roll = random.random()
-        print(f"🎲 Random roll: {random_roll:.3f} (threshold: {self.randomness:.3f})")
-        
         if random_roll < self.randomness:
             random_move = random.choice(available_moves)
-            print(f"🎲 USING RANDOM MOVE: {random_move} (due to {self.difficulty} difficulty)")
-            print("=== END DIFFICULTY TEST ===\n")
+            if trace is not None:
+                trace.event('random_move', roll=random_roll, move=random_move)
             return random_move
         
-        print(f"🧠 USING MINIMAX with depth limit: {self.max_depth}")
+        # The root counts as visited whether the table or the search answers
+        if stats is not None:
+            stats.visit(0)
+        
+        # Every reachable position is solved for every depth limit up front.
+        # A tree trace skips the table so there is a search to record; the
+        # search picks the same move.
+        if trace is None or not trace.tree:
+            table_move = perfect_play.best_move(engine, ai_player, self.max_depth)
+            if stats is not None:
+                stats.cache_probes += 1
+            if table_move is not None:
+                if stats is not None:
+                    stats.cache_hits += 1
+                if trace is not None:
+                    trace.event('table_move', move=table_move)
+                return table_move
+        
+        if stats is not None:
+            stats.expanded += 1
+        # Only tree traces follow the search below the root
+        node_trace = trace if trace is not None and trace.tree else None
         
         best_move = None
         best_score = float('-inf')
         
-        for i, (row, col) in enumerate(available_moves):
-            print(f"\n📊 Evaluating move {i+1}/{len(available_moves)}: ({row}, {col})")
-            
-            # Create a copy of the engine to simulate the move
-            temp_engine = engine.copy()
-            temp_engine.make_move(row, col, ai_player)
-            
-            # Reset depth counter for each move evaluation
-            self.depth_reached = 0  # We'll track this
-            
-            # Get score using minimax
+        for row, col in available_moves:
+            # Simulate the move in place and take it back afterwards
+            engine.make_move(row, col, ai_player)
             score = self._minimax(
-                temp_engine, 
+                engine, 
                 depth=0, 
                 is_maximizing=False,  # Next move will be opponent's
                 alpha=float('-inf'), 
                 beta=float('+inf'),
-                ai_player=ai_player
+                ai_player=ai_player,
+                stats=stats,
+                trace=node_trace
             )
-            
-            print(f"📈 Move ({row}, {col}): Score = {score}, Max depth reached = {self.depth_reached}")
+            engine.undo_move(row, col)
+            if trace is not None:
+                trace.event('root_move', move=(row, col), score=score)
             
             if score > best_score:
                 best_score = score
                 best_move = (row, col)
-                print(f"⭐ NEW BEST MOVE: {best_move} with score: {best_score}")
-        
-        print(f"\n🏆 FINAL CHOICE: {best_move} with score: {best_score}")
-        print(f"🎯 This was {self.difficulty.upper()} mode with max depth {self.max_depth}")
-        print("=== END DIFFICULTY TEST ===\n")
         
+        if trace is not None:
+            trace.event('choice', move=best_move, score=best_score)
         return best_move
     
     def _minimax(self, engine: TicTacToeEngine, depth: int, is_maximizing: bool, 
-            alpha: float, beta: float, ai_player: str) -> int:
+            alpha: float, beta: float, ai_player: str,
+            stats: Optional[SearchStats] = None,
+            trace: Optional[Trace] = None) -> int:
         """Minimax algorithm with alpha-beta pruning."""
-        
-        # Track the maximum depth we actually reach
-        if hasattr(self, 'depth_reached'):
-            self.depth_reached = max(self.depth_reached, depth)
-        else:
-            self.depth_reached = depth
-        
-        print(f"  {'  ' * depth}🔍 Depth {depth}: {'MAX' if is_maximizing else 'MIN'} player")
+        if stats is not None:
+            # depth counts from the root's children
+            stats.visit(depth + 1)
         
         # Terminal conditions
         if engine.is_terminal() or depth >= self.max_depth:
+            if stats is not None:
+                stats.leaves += 1
             score = engine.evaluate(ai_player)
             
-            if depth >= self.max_depth:
-                print(f"  {'  ' * depth}⛔ DEPTH LIMIT REACHED at {depth} (max: {self.max_depth})")
-            else:
-                print(f"  {'  ' * depth}🏁 Terminal state reached at depth {depth}")
-            
-            print(f"  {'  ' * depth}📊 Raw score: {score}")
-            
             # Prefer faster wins and slower losses
             if score > 0:
-                adjusted_score = score - depth
-                print(f"  {'  ' * depth}⚡ Win bonus: {score} - {depth} = {adjusted_score}")
-                return adjusted_score
+                score -= depth
             elif score < 0:
-                adjusted_score = score + depth
-                print(f"  {'  ' * depth}🐌 Loss penalty: {score} + {depth} = {adjusted_score}")
-                return adjusted_score
-            
+                score += depth
+            if trace is not None:
+                trace.node('leaf', depth=depth, score=score,
+                            horizon=not engine.is_terminal())
             return score
         
         available_moves = engine.get_available_moves()
+        if stats is not None:
+            stats.expanded += 1
         
         if is_maximizing:
             max_eval = float('-inf')
-            for i, (row, col) in enumerate(available_moves):
-                print(f"  {'  ' * depth}🔴 MAX trying move {i+1}/{len(available_moves)}: ({row},{col})")
-                
-                temp_engine = engine.copy()
-                temp_engine.make_move(row, col, ai_player)
-                
+            for row, col in available_moves:
+                engine.make_move(row, col, ai_player)
                 eval_score = self._minimax(
-                    temp_engine, depth + 1, False, alpha, beta, ai_player
+                    engine, depth + 1, False, alpha, beta, ai_player, stats, trace
                 )
+                engine.undo_move(row, col)
                 
                 max_eval = max(max_eval, eval_score)
                 alpha = max(alpha, eval_score)
-                
-                print(f"  {'  ' * depth}📈 Move ({row},{col}): {eval_score}, running max: {max_eval}")
+                if trace is not None:
+                    trace.node('move', depth=depth, player='max',
+                                move=(row, col), score=eval_score)
                 
                 # Alpha-beta pruning
                 if beta <= alpha:
-                    print(f"  {'  ' * depth}✂️  PRUNED remaining moves at depth {depth}")
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    if trace is not None:
+                        trace.node('cutoff', depth=depth)
                     break
             
             return max_eval
@@ -170,24 +189,25 @@ class MinimaxAI:
             min_eval = float('+inf')
             opponent = 'O' if ai_player == 'X' else 'X'
             
-            for i, (row, col) in enumerate(available_moves):
-                print(f"  {'  ' * depth}🔵 MIN trying move {i+1}/{len(available_moves)}: ({row},{col})")
-                
-                temp_engine = engine.copy()
-                temp_engine.make_move(row, col, opponent)
-                
+            for row, col in available_moves:
+                engine.make_move(row, col, opponent)
                 eval_score = self._minimax(
-                    temp_engine, depth + 1, True, alpha, beta, ai_player
+                    engine, depth + 1, True, alpha, beta, ai_player, stats, trace
                 )
+                engine.undo_move(row, col)
                 
                 min_eval = min(min_eval, eval_score)
                 beta = min(beta, eval_score)
-                
-                print(f"  {'  ' * depth}📉 Move ({row},{col}): {eval_score}, running min: {min_eval}")
+                if trace is not None:
+                    trace.node('move', depth=depth, player='min',
+                                move=(row, col), score=eval_score)
                 
                 # Alpha-beta pruning
                 if beta <= alpha:
-                    print(f"  {'  ' * depth}✂️  PRUNED remaining moves at depth {depth}")
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    if trace is not None:
+                        trace.node('cutoff', depth=depth)
                     break
             
-            return min_eval
\ No newline at end of file
+            return min_eval
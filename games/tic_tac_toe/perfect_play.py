@@ -0,0 +1,156 @@
+"""
+Tic-Tac-Toe Perfect Play Table
+Every position reachable from the empty board with X moving first, solved
+once at import. Games where O moved first are looked up with the colours
+swapped, which the search cannot tell apart. For each position it stores the depth-limited minimax value
+at every search horizon, so MinimaxAI at any depth limit is answered by a
+lookup instead of a search. Positions are keyed on their symmetry class, so
+rotations and reflections of a board share one entry.
+"""
+
+from typing import Dict, Optional, Tuple
+
+from .engine import FULL, LINE_MASKS, TicTacToeEngine
+from .symmetry import INVERSE, canonical, key_masks, transform_mask
+
+# Deepest horizon worth storing: a game never lasts more than nine moves
+MAX_HORIZON = 9
+
+WIN_SCORE = 10
+
+
+def _to_move(x: int, o: int) -> str:
+    return 'X' if bin(x).count('1') == bin(o).count('1') else 'O'
+
+
+def _first_mover_view(engine: TicTacToeEngine,
+                      to_move: str) -> Optional[Tuple[int, int, str]]:
+    """
+    (x, o, first): the board with the side that moved first as X, as the
+    table stores it, and which player that side is. None if to_move cannot
+    be the side to move.
+    """
+    mine, theirs = (engine.x, engine.o) if to_move == 'X' else (engine.o, engine.x)
+    placed, opponent_placed = bin(mine).count('1'), bin(theirs).count('1')
+    if placed == opponent_placed:
+        return mine, theirs, to_move
+    if placed + 1 == opponent_placed:
+        return theirs, mine, 'O' if to_move == 'X' else 'X'
+    return None
+
+
+def _score(x: int, o: int) -> int:
+    """+10 if X has a line, -10 if O has one, else 0."""
+    for mask in LINE_MASKS:
+        if x & mask == mask:
+            return WIN_SCORE
+        if o & mask == mask:
+            return -WIN_SCORE
+    return 0
+
+
+def _deeper(value: int) -> int:
+    """A value seen one ply further from the root: wins and losses shrink by one."""
+    if value > 0:
+        return value - 1
+    if value < 0:
+        return value + 1
+    return 0
+
+
+class PerfectPlayTable:
+    """
+    Values follow MinimaxAI._minimax: +10 for an X win and -10 for an O win,
+    minus one per ply from the position where the search starts, and 0 when
+    the horizon is reached without a winner. Values are from X's side;
+    negate them for O.
+    """
+
+    def __init__(self):
+        # canonical key -> value at each horizon 0..MAX_HORIZON
+        self.values: Dict[int, Tuple[int, ...]] = {}
+        # canonical key -> mask of the best cells on the canonical board,
+        # for each search depth limit 0..MAX_HORIZON
+        self.best: Dict[int, Tuple[int, ...]] = {}
+        self._solve(0, 0)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _solve(self, x: int, o: int) -> Tuple[int, ...]:
+        key, _ = canonical(x, o)
+        values = self.values.get(key)
+        if values is not None:
+            return values
+        x, o = key_masks(key)
+
+        score = _score(x, o)
+        if score or x | o == FULL:
+            values = self.values[key] = (score,) * (MAX_HORIZON + 1)
+            return values
+
+        empties = [i for i in range(9) if not (x | o) >> i & 1]
+        if _to_move(x, o) == 'X':
+            sign = 1
+            children = [(i, self._solve(x | 1 << i, o)) for i in empties]
+        else:
+            sign = -1
+            children = [(i, self._solve(x, o | 1 << i)) for i in empties]
+
+        # Reaching the horizon without a winner scores 0
+        values = [0]
+        for horizon in range(1, MAX_HORIZON + 1):
+            values.append(sign * max(sign * _deeper(child[horizon - 1])
+                                     for _, child in children))
+        self.values[key] = values = tuple(values)
+
+        # MinimaxAI scores each root move by searching the child with the
+        # full depth limit. Keep every move with the best score; the lookup
+        # picks the first of them in the caller's board order.
+        best = []
+        for depth in range(MAX_HORIZON + 1):
+            best_value = max(sign * child[depth] for _, child in children)
+            best.append(sum(1 << i for i, child in children
+                            if sign * child[depth] == best_value))
+        self.best[key] = tuple(best)
+        return values
+
+    def value(self, engine: TicTacToeEngine, player: str,
+              horizon: int = MAX_HORIZON) -> Optional[int]:
+        """
+        Minimax value for player with engine.current_player to move, or None
+        if the position is unreachable.
+        """
+        view = _first_mover_view(engine, engine.current_player)
+        if view is None:
+            return None
+        x, o, first = view
+        values = self.values.get(canonical(x, o)[0])
+        if values is None:
+            return None
+        value = values[min(horizon, MAX_HORIZON)]
+        return value if player == first else -value
+
+    def best_move(self, engine: TicTacToeEngine, player: str,
+                  max_depth: int = MAX_HORIZON) -> Optional[Tuple[int, int]]:
+        """
+        The (row, col) MinimaxAI would choose for player with this depth
+        limit. None when the table cannot answer: the game is over, the
+        position is unreachable, or it is not player's turn.
+        """
+        view = _first_mover_view(engine, player)
+        if view is None:
+            return None
+        key, transform = canonical(*view[:2])
+        best = self.best.get(key)
+        if best is None:
+            return None
+        # Back to the caller's orientation, where the first best move in
+        # row-major order is the lowest set bit
+        moves = transform_mask(best[max(0, min(max_depth, MAX_HORIZON))],
+                               INVERSE[transform])
+        return divmod((moves & -moves).bit_length() - 1, 3)
+
+
+# Built once per process; solving every position takes a fraction of a second
+perfect_play = PerfectPlayTable()
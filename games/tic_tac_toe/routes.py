@@ -1,115 +1,64 @@
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, Response, render_template, request, jsonify, session
+import copy
+import logging
 import random
+from ..jobs import job_manager, JobQueueFull
+from ..search_stats import SearchStats, search_stats
+from ..tracing import Trace, trace_buffer, trace_level
 from .minimax import MinimaxAI
-from .engine import TicTacToeEngine
+from .engine import TicTacToeEngine, check_winner, is_board_full
+from . import gomoku
 from . import tic_tac_toe_bp
 
-# Note: The original file did not include the check_winner, is_board_full, 
-# and get_smart_fallback_move utility functions, but they were implicitly 
-# used in the original routes.py snippet. For a complete, working file, 
-# I will include them here based on the functions provided in your prompt.
+logger = logging.getLogger(__name__)
 
-# --- UTILITY FUNCTIONS FROM YOUR PROMPT ---
+# --- UTILITY FUNCTIONS ---
+# Session boards mark empty cells with None. Winner and full-board checks
+# come from the engine, which reads None or '' as empty.
 
-def check_winner(board):
-    """Check if there's a winner - works with None values"""
-    # Check rows
-    for row in board:
-        if row[0] and row[0] == row[1] == row[2]:
-            return row[0]
-    
-    # Check columns
-    for col in range(3):
-        if board[0][col] and board[0][col] == board[1][col] == board[2][col]:
-            return board[0][col]
-    
-    # Check diagonals
-    if board[0][0] and board[0][0] == board[1][1] == board[2][2]:
-        return board[0][0]
-    
-    if board[0][2] and board[0][2] == board[1][1] == board[2][0]:
-        return board[0][2]
-    
-    return None
-
-def check_winner_internal(board):
-    """Internal winner checker for string-based board."""
-    # Check rows
-    for row in board:
-        if row[0] == row[1] == row[2] != '':
-            return row[0]
-    
-    # Check columns
-    for col in range(3):
-        if board[0][col] == board[1][col] == board[2][col] != '':
-            return board[0][col]
+def get_smart_fallback_move(board):
+    """Smart fallback AI that checks for wins and blocks."""
+    engine = TicTacToeEngine.from_board(board)
+    available_moves = engine.get_available_moves()
     
-    # Check diagonals
-    if board[0][0] == board[1][1] == board[2][2] != '':
-        return board[0][0]
+    # First, try to win, then try to block opponent
+    for player in ('O', 'X'):
+        for row, col in available_moves:
+            if engine.completes_line(row, col, player):
+                return (row, col)
     
-    if board[0][2] == board[1][1] == board[2][0] != '':
-        return board[0][2]
+    # Take center, then corners, then any remaining spot
+    for move in [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2)] + available_moves:
+        if move in available_moves:
+            return move
     
     return None
 
-def is_board_full(board):
-    """Check if board is full"""
-    for row in board:
-        for cell in row:
-            if cell is None:
-                return False
-    return True
+def _game_result(state, row, col):
+    """(winner, board_full) after a stone at (row, col). Gomoku states carry
+    their win length as 'connect' and only check lines through that stone."""
+    board = state['board']
+    if state.get('connect'):
+        winner = gomoku.winner_at(board, row, col, state['connect'])
+        return winner, all(cell is not None for line in board for cell in line)
+    return check_winner(board), is_board_full(board)
 
-def get_smart_fallback_move(board):
-    """Smart fallback AI that checks for wins and blocks."""
-    # Convert None to empty string for easier processing
-    b = []
-    for row in board:
-        b_row = []
-        for cell in row:
-            b_row.append(cell if cell is not None else '')
-        b.append(b_row)
-    
-    # First, try to win
-    for row in range(3):
-        for col in range(3):
-            if b[row][col] == '':
-                b[row][col] = 'O'
-                if check_winner_internal(b) == 'O':
-                    return (row, col)
-                b[row][col] = ''
-    
-    # Then, try to block opponent
-    for row in range(3):
-        for col in range(3):
-            if b[row][col] == '':
-                b[row][col] = 'X'
-                if check_winner_internal(b) == 'X':
-                    b[row][col] = ''
-                    return (row, col)
-                b[row][col] = ''
-    
-    # Take center if available
-    if b[1][1] == '':
-        return (1, 1)
-    
-    # Take corners
-    corners = [(0, 0), (0, 2), (2, 0), (2, 2)]
-    for row, col in corners:
-        if b[row][col] == '':
-            return (row, col)
-    
-    # Take any remaining spot
-    for row in range(3):
-        for col in range(3):
-            if b[row][col] == '':
-                return (row, col)
-    
-    return None
+def _fallback_move(state):
+    """Move for when the AI search fails."""
+    if state.get('connect'):
+        return next(((r, c) for r, line in enumerate(state['board'])
+                     for c, cell in enumerate(line) if cell is None), None)
+    return get_smart_fallback_move(state['board'])
 
 # --- END UTILITY FUNCTIONS ---
 
+# Longest a job poll may block, in seconds
+MAX_JOB_WAIT = 30
+
+# Difficulties a game may be started with; anything else plays as 'medium'.
+# Search statistics are kept per difficulty, so this bounds their keys.
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
 
 @tic_tac_toe_bp.route('/play')
 def play():
@@ -148,36 +97,56 @@ def get_state():
 def new_game():
     """Start a new game"""
     data = request.get_json()
-    difficulty = data.get('difficulty', 'medium')
+    difficulty = str(data.get('difficulty', 'medium')).lower()
+    if difficulty not in DIFFICULTIES:
+        difficulty = 'medium'
     first_player = data.get('first_player', 'human')
     game_mode = data.get('game_mode', 'pve') # New: Get game mode
     
+    # Gomoku mode plays the bot on an N x N board, k in a row to win
+    size, connect = 3, None
+    if game_mode == 'gomoku':
+        try:
+            size = int(data.get('size', gomoku.DEFAULT_SIZE))
+            connect = int(data.get('connect', gomoku.DEFAULT_CONNECT))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Board size and connect must be integers'})
+        if not (gomoku.MIN_SIZE <= size <= gomoku.MAX_SIZE
+                and gomoku.MIN_CONNECT <= connect <= size):
+            return jsonify({'success': False, 'error': (
+                f'Board size must be {gomoku.MIN_SIZE} to {gomoku.MAX_SIZE} and '
+                f'connect {gomoku.MIN_CONNECT} to the board size')})
+    
     # Determine the starting player
     # X is always the first player to start the board. 
     # In PVE, if 'ai' is first, current_player becomes 'O'.
     # In PVP, 'X' always starts.
     start_player = 'X'
-    if game_mode == 'pve' and first_player == 'ai':
+    ai_first = game_mode in ('pve', 'gomoku') and first_player == 'ai'
+    if ai_first:
         start_player = 'O'
     
     # Initialize new game state
     state = {
-        'board': [[None, None, None], [None, None, None], [None, None, None]],
+        'board': [[None] * size for _ in range(size)],
         'current_player': start_player,
         'game_over': False,
         'winner': None
     }
+    if connect:
+        state['connect'] = connect
     
     session['tic_tac_toe_state'] = state
     session['tic_tac_toe_difficulty'] = difficulty
     session['first_player'] = first_player
     session['tic_tac_toe_game_mode'] = game_mode # New: Store game mode
+    session.pop('tic_tac_toe_pending_job', None)
     
     return jsonify({
         'success': True,
         'state': state,
-        # AI should only move if it's PVE mode AND the AI is the first player
-        'ai_should_move': (game_mode == 'pve' and first_player == 'ai')
+        # AI should only move if it's playing the bot AND the AI is the first player
+        'ai_should_move': ai_first
     })
 
 @tic_tac_toe_bp.route('/api/move', methods=['POST'])
@@ -193,10 +162,19 @@ def make_move():
     if not state:
         return jsonify({'success': False, 'error': 'No active game'})
     
+    # A queued AI move would be played on top of this one
+    if session.get('tic_tac_toe_pending_job'):
+        return jsonify({'success': False, 'error': 'AI is still thinking'}), 409
+    
     # Validate move
     if state['game_over']:
         return jsonify({'success': False, 'error': 'Game is over'})
     
+    size = len(state['board'])
+    if not (isinstance(row, int) and isinstance(col, int)
+            and 0 <= row < size and 0 <= col < size):
+        return jsonify({'success': False, 'error': 'Invalid cell'})
+    
     if state['board'][row][col] is not None:
         return jsonify({'success': False, 'error': 'Cell already occupied'})
     
@@ -204,11 +182,11 @@ def make_move():
     state['board'][row][col] = state['current_player']
     
     # Check for win/draw
-    winner = check_winner(state['board'])
+    winner, board_full = _game_result(state, row, col)
     if winner:
         state['winner'] = winner
         state['game_over'] = True
-    elif is_board_full(state['board']):
+    elif board_full:
         state['game_over'] = True
         state['winner'] = None
     else:
@@ -231,114 +209,203 @@ def make_move():
         'state': state
     })
 
+def _choose_ai_move(state, difficulty, stats=None, trace=None, time_budget=None):
+    """
+    Pick the AI's (row, col) for a session state using minimax, or the
+    simple fallback AI if minimax fails. Returns None if no move is possible.
+    stats, a SearchStats, collects counters for the search, and trace, a
+    Trace, records its decisions. time_budget, in seconds, caps a gomoku
+    search; None uses the difficulty's default.
+    """
+    try:
+        if state.get('connect'):
+            engine = gomoku.GomokuEngine.from_board(state['board'], state['connect'], 'O')
+            ai = gomoku.GomokuAI(difficulty, time_budget)
+            return ai.get_best_move(engine, 'O', stats, trace)
+        
+        # Create engine from current state
+        engine = TicTacToeEngine()
+        engine.set_state(dict(state, current_player='O'))
+        
+        ai = MinimaxAI(difficulty)
+        return ai.get_best_move(engine, 'O', stats, trace)
+        
+    except Exception as e:
+        logger.exception('AI search failed, using the fallback AI')
+        if trace is not None:
+            trace.event('fallback', error=str(e))
+        return _fallback_move(state)
+
+def _time_budget(data):
+    """A gomoku move's time budget from the request, or None for the default."""
+    time_budget = data.get('time_budget')
+    if time_budget is None:
+        return None
+    time_budget = float(time_budget)
+    # Written so that NaN fails too
+    if not time_budget > 0:
+        raise ValueError('time_budget must be positive')
+    return time_budget
+
+def _apply_ai_move(state, ai_move):
+    """Play the AI's move on the session state and check for a win or draw."""
+    ai_row, ai_col = ai_move
+    
+    # Make AI move
+    state['board'][ai_row][ai_col] = 'O'
+    
+    # Check for win/draw
+    winner, board_full = _game_result(state, ai_row, ai_col)
+    if winner:
+        state['winner'] = winner
+        state['game_over'] = True
+    elif board_full:
+        state['game_over'] = True
+        state['winner'] = None
+    else:
+        state['current_player'] = 'X'
+    
+    session['tic_tac_toe_state'] = state
+    return state
+
+def _ai_turn_error(state, game_mode):
+    """Why the AI cannot move now, or None if it can."""
+    if not state:
+        return 'No active game'
+    if state['game_over'] or state['current_player'] != 'O' or game_mode == 'pvp': # Added pvp check as a safety
+        return 'Not AI turn or incorrect mode'
+    return None
+
 @tic_tac_toe_bp.route('/api/ai-move', methods=['POST'])
 def ai_move():
-    """Handle AI move using minimax algorithm"""
+    """Handle AI move using minimax, or the gomoku search in gomoku mode"""
     state = session.get('tic_tac_toe_state')
     difficulty = session.get('tic_tac_toe_difficulty', 'medium')
     game_mode = session.get('tic_tac_toe_game_mode', 'pve')
     
-    print(f"\n=== AI MOVE DEBUG ===")
-    print(f"Game Mode: {game_mode}, Difficulty: {difficulty}")
-    print(f"Current state: {state}")
+    error = _ai_turn_error(state, game_mode)
+    if error:
+        return jsonify({'success': False, 'error': error})
     
-    if not state:
-        return jsonify({'success': False, 'error': 'No active game'})
+    # Search statistics and traces are only collected when the client asks
+    data = request.get_json(silent=True) or {}
+    stats = SearchStats() if data.get('stats') else None
+    try:
+        level = trace_level(data.get('trace'))
+        time_budget = _time_budget(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)})
+    trace = Trace('tic_tac_toe.ai_move', level) if level else None
     
-    if state['game_over'] or state['current_player'] != 'O' or game_mode == 'pvp': # Added pvp check as a safety
-        return jsonify({'success': False, 'error': 'Not AI turn or incorrect mode'})
+    ai_move = _choose_ai_move(state, difficulty, stats, trace, time_budget)
+    if trace is not None:
+        trace_buffer.add(trace)
+    if ai_move is None:
+        return jsonify({'success': False, 'error': 'No available moves'})
+    
+    state = _apply_ai_move(state, ai_move)
+    
+    response = {
+        'success': True,
+        'state': state
+    }
+    if stats is not None:
+        game = 'gomoku' if state.get('connect') else 'tic_tac_toe'
+        search_stats.record(game, difficulty, stats)
+        response['stats'] = stats.to_dict()
+    if trace is not None:
+        response['trace_id'] = trace.id
+    return jsonify(response)
+
+@tic_tac_toe_bp.route('/api/stats', methods=['GET'])
+def get_search_stats():
+    """Search statistics per difficulty, over AI moves that collected them."""
+    return jsonify({
+        'success': True,
+        'stats': search_stats.summary('tic_tac_toe'),
+        'gomoku_stats': search_stats.summary('gomoku')
+    })
+
+@tic_tac_toe_bp.route('/api/traces', methods=['GET'])
+def list_traces():
+    """Summaries of the AI move traces still in the buffer, newest first."""
+    return jsonify({
+        'success': True,
+        'traces': trace_buffer.recent('tic_tac_toe.ai_move')
+    })
+
+@tic_tac_toe_bp.route('/api/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """Fetch a trace recorded by an AI move with {"trace": ...}."""
+    trace = trace_buffer.get(trace_id)
+    if trace is None:
+        return jsonify({'success': False, 'error': 'Unknown trace'})
+    return jsonify(dict(trace.to_dict(), success=True))
+
+@tic_tac_toe_bp.route('/api/ai-move/jobs', methods=['POST'])
+def submit_ai_move_job():
+    """Queue the AI's move as a background job and return its ID."""
+    state = session.get('tic_tac_toe_state')
+    difficulty = session.get('tic_tac_toe_difficulty', 'medium')
+    game_mode = session.get('tic_tac_toe_game_mode', 'pve')
+    
+    error = _ai_turn_error(state, game_mode)
+    if error:
+        return jsonify({'success': False, 'error': error})
+    if session.get('tic_tac_toe_pending_job'):
+        return jsonify({'success': False, 'error': 'AI is still thinking'})
     
+    data = request.get_json(silent=True) or {}
     try:
-        # Create engine from current state
-        engine = TicTacToeEngine()
-        
-        # Convert None to empty string for engine compatibility
-        engine.board = []
-        for row in state['board']:
-            engine_row = []
-            for cell in row:
-                engine_row.append(cell if cell is not None else '')
-            engine.board.append(engine_row)
-        
-        print(f"Engine board: {engine.board}")
-        
-        engine.current_player = 'O'
-        engine.game_over = state['game_over']
-        engine.winner = state['winner']
-        
-        # Get available moves
-        available_moves = engine.get_available_moves()
-        print(f"Available moves: {available_moves}")
-        
-        # Initialize AI with difficulty
-        ai = MinimaxAI(difficulty)
-        print(f"AI initialized with difficulty: {ai.difficulty}")
-        print(f"AI max_depth: {ai.max_depth}")
-        print(f"AI randomness: {ai.randomness}")
-        
-        # Get AI move
-        ai_move = ai.get_best_move(engine, 'O')
-        print(f"AI chose move: {ai_move}")
-        
-        if ai_move is None:
-            print("AI returned None - no moves available")
-            return jsonify({'success': False, 'error': 'No available moves'})
-        
-        ai_row, ai_col = ai_move
-        
-        # Make AI move
-        state['board'][ai_row][ai_col] = 'O'
-        
-        # Check for win/draw
-        winner = check_winner(state['board'])
-        if winner:
-            state['winner'] = winner
-            state['game_over'] = True
-        elif is_board_full(state['board']):
-            state['game_over'] = True
-            state['winner'] = None
-        else:
-            state['current_player'] = 'X'
-        
-        session['tic_tac_toe_state'] = state
-        
-        print(f"Final state after AI move: {state}")
-        print("=== END AI MOVE DEBUG ===\n")
-        
-        return jsonify({
-            'success': True,
-            'state': state
-        })
-        
-    except Exception as e:
-        print(f"MINIMAX ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # Fallback to simple smart AI
-        print("Falling back to simple AI")
-        ai_move = get_smart_fallback_move(state['board'])
-        
-        if ai_move is None:
-            return jsonify({'success': False, 'error': 'No available moves'})
-        
-        ai_row, ai_col = ai_move
-        state['board'][ai_row][ai_col] = 'O'
-        
-        # Check for win/draw
-        winner = check_winner(state['board'])
-        if winner:
-            state['winner'] = winner
-            state['game_over'] = True
-        elif is_board_full(state['board']):
-            state['game_over'] = True
-            state['winner'] = None
-        else:
-            state['current_player'] = 'X'
-        
-        session['tic_tac_toe_state'] = state
-        
-        return jsonify({
-            'success': True,
-            'state': state
-        })
\ No newline at end of file
+        time_budget = _time_budget(data)
+        job = job_manager.submit('tic_tac_toe', _choose_ai_move,
+                                 copy.deepcopy(state), difficulty,
+                                 time_budget=time_budget)
+    except (TypeError, ValueError, JobQueueFull) as e:
+        return jsonify({'success': False, 'error': str(e)})
+    
+    session['tic_tac_toe_pending_job'] = job.id
+    return jsonify(dict(job.to_dict(), success=True, state=state))
+
+@tic_tac_toe_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_ai_move_job(job_id):
+    """
+    Poll an AI move job. ?wait=N long-polls for up to N seconds. Once the
+    job is done, the first fetch from the submitting session plays the move.
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_JOB_WAIT)
+    except ValueError:
+        wait = 0
+    job = job_manager.get(job_id, wait)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'})
+    
+    if not job.done.is_set() or session.get('tic_tac_toe_pending_job') != job.id:
+        return jsonify(dict(job.to_dict(), success=True))
+    
+    session.pop('tic_tac_toe_pending_job')
+    state = session.get('tic_tac_toe_state')
+    error = _ai_turn_error(state, session.get('tic_tac_toe_game_mode', 'pve'))
+    if error:
+        return jsonify(dict(job.to_dict(), success=False, error=error))
+    ai_move = job.result if job.status == 'done' else _fallback_move(state)
+    if ai_move is None:
+        return jsonify(dict(job.to_dict(), success=False, error='No available moves'))
+    # The job searched the board as it was when queued
+    if state['board'][ai_move[0]][ai_move[1]] is not None:
+        return jsonify(dict(job.to_dict(), success=False, error='Cell already occupied'))
+    
+    state = _apply_ai_move(state, ai_move)
+    return jsonify(dict(job.to_dict(), success=True, state=state))
+
+@tic_tac_toe_bp.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_ai_move_job(job_id):
+    """
+    Server-sent events with the job's status changes. The stream cannot
+    update the session, so fetch /api/jobs/<job_id> once it reports done.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'})
+    return Response(job_manager.stream(job), mimetype='text/event-stream')
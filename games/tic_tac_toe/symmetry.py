@@ -0,0 +1,75 @@
+"""
+Tic-Tac-Toe Board Symmetry
+The board has eight symmetries: four rotations and four reflections.
+canonical() picks one representative per symmetry class, so tables keyed on
+it hold each class once. A move found on the canonical board maps back with
+restore_move().
+"""
+
+from typing import Tuple
+
+# One bit per cell, row * 3 + col, as in TicTacToeEngine's masks
+CELLS_MASK = 0x1FF
+
+# Where each transform sends cell (row, col)
+_CELL_MAPS = (
+    lambda r, c: (r, c),          # identity
+    lambda r, c: (c, 2 - r),      # rotate 90
+    lambda r, c: (2 - r, 2 - c),  # rotate 180
+    lambda r, c: (2 - c, r),      # rotate 270
+    lambda r, c: (r, 2 - c),      # mirror left-right
+    lambda r, c: (2 - r, c),      # mirror top-bottom
+    lambda r, c: (c, r),          # main diagonal
+    lambda r, c: (2 - c, 2 - r),  # anti-diagonal
+)
+
+# PERMUTATIONS[t][i] is the cell index that cell i moves to under transform t
+PERMUTATIONS = tuple(
+    tuple(row * 3 + col for row, col in (f(*divmod(i, 3)) for i in range(9)))
+    for f in _CELL_MAPS)
+
+# INVERSE[t] undoes transform t
+INVERSE = tuple(
+    next(u for u, back in enumerate(PERMUTATIONS)
+         if all(back[perm[i]] == i for i in range(9)))
+    for perm in PERMUTATIONS)
+
+# _MASK_MAPS[t][mask] is mask with every cell moved by transform t
+_MASK_MAPS = tuple(
+    tuple(sum(1 << perm[i] for i in range(9) if mask >> i & 1)
+          for mask in range(CELLS_MASK + 1))
+    for perm in PERMUTATIONS)
+
+
+def transform_mask(mask: int, transform: int) -> int:
+    return _MASK_MAPS[transform][mask]
+
+
+def canonical(x: int, o: int) -> Tuple[int, int]:
+    """
+    (key, transform) for the board with X mask x and O mask o. key packs
+    the canonical board as x | o << 9, the smallest over all eight
+    transforms, and transform is the one that produces it.
+    """
+    best_key, best_transform = x | o << 9, 0
+    for transform in range(1, 8):
+        maps = _MASK_MAPS[transform]
+        key = maps[x] | maps[o] << 9
+        if key < best_key:
+            best_key, best_transform = key, transform
+    return best_key, best_transform
+
+
+def key_masks(key: int) -> Tuple[int, int]:
+    """The X and O masks packed into a canonical key."""
+    return key & CELLS_MASK, key >> 9
+
+
+def transform_move(move: Tuple[int, int], transform: int) -> Tuple[int, int]:
+    """Where (row, col) lands under transform."""
+    return divmod(PERMUTATIONS[transform][move[0] * 3 + move[1]], 3)
+
+
+def restore_move(move: Tuple[int, int], transform: int) -> Tuple[int, int]:
+    """Map a move on the canonical board back to the board canonical() was given."""
+    return transform_move(move, INVERSE[transform])
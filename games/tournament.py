@@ -0,0 +1,303 @@
+"""
+Engine Self-Play Tournaments
+Plays AI setups against each other without the web app, to tell whether an
+engine change makes the AI stronger or only faster. Every pair of players
+meets the same number of times with colours alternating; games run on a
+process pool and each game is seeded, so a tournament can be replayed.
+
+A player is a difficulty, optionally followed by settings:
+    medium                      Connect-4 or tic-tac-toe difficulty
+    hard:time_budget=0.5        Connect-4 with a 0.5s iterative budget
+    medium:depth=6              Connect-4 at a fixed depth
+    easy:randomness=0           tic-tac-toe without random moves
+
+Usage:
+    python -m games.tournament connect4 medium hard:depth=5 --games 20
+    python -m games.tournament tic_tac_toe easy medium hard --json
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+GAMES = ('connect4', 'tic_tac_toe')
+
+# Random plies played before the engines take over, so that deterministic
+# engines do not replay one game over and over
+OPENING_PLIES = {'connect4': 2, 'tic_tac_toe': 0}
+
+# Rating given to the average player
+BASE_ELO = 1500
+
+
+def parse_player(spec: str) -> Dict:
+    """Turn 'hard:time_budget=0.5,depth=8' into a settings dict."""
+    difficulty, _, options = spec.partition(':')
+    player = {'difficulty': difficulty}
+    for option in filter(None, options.split(',')):
+        name, _, value = option.partition('=')
+        player[name] = None if value == 'none' else float(value)
+        if name == 'depth':
+            player[name] = int(player[name])
+    return player
+
+
+class _PlayerStats:
+    def __init__(self):
+        self.moves = 0
+        self.seconds = 0.0
+        self.nodes = 0
+
+    def record(self, seconds: float, nodes: int) -> None:
+        self.moves += 1
+        self.seconds += seconds
+        self.nodes += nodes
+
+
+def _play_connect4(players: List[Dict], seed: int, opening_plies: int,
+                   rows: int, cols: int, k: int) -> Tuple[Optional[int], List[Dict]]:
+    from .connect4.engine import (
+        EMPTY, PLAYER, AI, create_board, drop_piece, get_next_open_row,
+        get_valid_locations, winning_move
+    )
+    from .connect4.minimax import get_best_move
+    from .connect4.transposition import TranspositionTable
+    from .search_stats import SearchStats
+
+    rng = random.Random(seed)
+    board = create_board(rows, cols)
+    pieces = (PLAYER, AI)
+    tables = [TranspositionTable(), TranspositionTable()]
+    stats = [_PlayerStats(), _PlayerStats()]
+    swap = {EMPTY: EMPTY, PLAYER: AI, AI: PLAYER}
+
+    for ply in range(rows * cols):
+        mover = ply % 2
+        piece = pieces[mover]
+        if ply < opening_plies:
+            col = rng.choice(get_valid_locations(board))
+        else:
+            # The search always plays the AI's pieces
+            view = board if piece == AI else [[swap[c] for c in row] for row in board]
+            settings = dict(players[mover])
+            search = SearchStats()
+            start = time.perf_counter()
+            col = get_best_move(view, settings.pop('difficulty'),
+                                table=tables[mover], parallel=False,
+                                cache=False, k=k, stats=search, **settings)
+            stats[mover].record(time.perf_counter() - start, search.nodes)
+        drop_piece(board, get_next_open_row(board, col), col, piece)
+        if winning_move(board, piece, k):
+            return mover, [vars(s) for s in stats]
+    return None, [vars(s) for s in stats]
+
+
+def _play_tic_tac_toe(players: List[Dict], seed: int,
+                      opening_plies: int) -> Tuple[Optional[int], List[Dict]]:
+    from .tic_tac_toe.engine import TicTacToeEngine
+    from .tic_tac_toe.minimax import MinimaxAI
+    from .search_stats import SearchStats
+
+    rng = random.Random(seed)
+    ais = []
+    for settings in players:
+        ai = MinimaxAI(settings['difficulty'])
+        if 'depth' in settings:
+            ai.max_depth = settings['depth']
+        if 'randomness' in settings:
+            ai.randomness = settings['randomness']
+        ais.append(ai)
+
+    engine = TicTacToeEngine()
+    symbols = ('X', 'O')
+    stats = [_PlayerStats(), _PlayerStats()]
+    ply = 0
+    while not engine.game_over:
+        mover = ply % 2
+        if ply < opening_plies:
+            move = rng.choice(engine.get_available_moves())
+        else:
+            search = SearchStats()
+            start = time.perf_counter()
+            move = ais[mover].get_best_move(engine, symbols[mover], search)
+            stats[mover].record(time.perf_counter() - start, search.nodes)
+        engine.make_move(move[0], move[1], symbols[mover])
+        ply += 1
+    if engine.winner is None:
+        return None, [vars(s) for s in stats]
+    return symbols.index(engine.winner), [vars(s) for s in stats]
+
+
+def play_game(game: str, players: List[Dict], seed: int,
+              opening_plies: int, options: Dict) -> Tuple[Optional[int], List[Dict]]:
+    """
+    Play one game; players[0] moves first. Returns (winner, stats) where
+    winner is 0, 1 or None for a draw and stats holds each side's move
+    count, thinking time and nodes searched.
+    """
+    # Seed the module-level generator used for easy and medium random moves
+    random.seed(seed)
+    if game == 'connect4':
+        return _play_connect4(players, seed, opening_plies,
+                              options.get('rows', 6), options.get('cols', 7),
+                              options.get('connect', 4))
+    return _play_tic_tac_toe(players, seed, opening_plies)
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+def elo_difference(score: float, games: int) -> float:
+    """Elo gap implied by a score fraction, clamped away from 0 and 1."""
+    margin = 0.5 / games
+    score = min(max(score, margin), 1 - margin)
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_ratings(names: List[str], pairings: List[Dict],
+                iterations: int = 500) -> Dict[str, float]:
+    """
+    Fit ratings to all results at once, Bradley-Terry style, with draws
+    counting as half a win. One virtual draw per pairing keeps ratings
+    finite when a player wins every game.
+    """
+    ratings = {name: float(BASE_ELO) for name in names}
+    for _ in range(iterations):
+        delta = {name: 0.0 for name in names}
+        games = {name: 0 for name in names}
+        for p in pairings:
+            a, b = p['a'], p['b']
+            n = p['a_wins'] + p['draws'] + p['b_wins'] + 1
+            score = p['a_wins'] + 0.5 * (p['draws'] + 1)
+            expected = n * expected_score(ratings[a], ratings[b])
+            delta[a] += score - expected
+            delta[b] -= score - expected
+            games[a] += n
+            games[b] += n
+        for name in names:
+            if games[name]:
+                ratings[name] += 400 * delta[name] / games[name]
+        mean = sum(ratings.values()) / len(ratings)
+        ratings = {name: r - mean + BASE_ELO for name, r in ratings.items()}
+    return ratings
+
+
+def run_tournament(game: str, specs: List[str], games: int = 10,
+                   seed: int = 0, workers: Optional[int] = None,
+                   opening_plies: Optional[int] = None,
+                   options: Optional[Dict] = None) -> Dict:
+    """
+    Round robin between the player specs, `games` games per pairing.
+    Returns per-pairing W/D/L with the implied Elo gap, fitted ratings, and
+    each player's average move latency and nodes per second.
+    """
+    if game not in GAMES:
+        raise ValueError(f'Unknown game: {game}')
+    if len(specs) < 2:
+        raise ValueError('A tournament needs at least two players')
+    if opening_plies is None:
+        opening_plies = OPENING_PLIES[game]
+    options = options or {}
+    players = [parse_player(spec) for spec in specs]
+
+    schedule = []
+    for a, b in combinations(range(len(specs)), 2):
+        for g in range(games):
+            first, second = (a, b) if g % 2 == 0 else (b, a)
+            schedule.append((first, second, seed * 1000003 + len(schedule)))
+
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(play_game, game, [players[first], players[second]],
+                               game_seed, opening_plies, options)
+                   for first, second, game_seed in schedule]
+        outcomes = [future.result() for future in futures]
+
+    totals = [_PlayerStats() for _ in specs]
+    results = {pair: [0, 0, 0] for pair in combinations(range(len(specs)), 2)}
+    for (first, second, _), (winner, stats) in zip(schedule, outcomes):
+        for index, side in ((first, 0), (second, 1)):
+            totals[index].moves += stats[side]['moves']
+            totals[index].seconds += stats[side]['seconds']
+            totals[index].nodes += stats[side]['nodes']
+        a, b = min(first, second), max(first, second)
+        if winner is None:
+            results[a, b][1] += 1
+        elif (first, second)[winner] == a:
+            results[a, b][0] += 1
+        else:
+            results[a, b][2] += 1
+
+    pairings = []
+    for (a, b), (a_wins, draws, b_wins) in results.items():
+        pairings.append({
+            'a': specs[a],
+            'b': specs[b],
+            'a_wins': a_wins,
+            'draws': draws,
+            'b_wins': b_wins,
+            'elo_diff': elo_difference((a_wins + 0.5 * draws) / games, games),
+        })
+    ratings = elo_ratings(specs, pairings)
+
+    return {
+        'game': game,
+        'games_per_pairing': games,
+        'seed': seed,
+        'opening_plies': opening_plies,
+        'pairings': pairings,
+        'players': [{
+            'player': spec,
+            'elo': ratings[spec],
+            'moves': total.moves,
+            'avg_move_ms': 1000 * total.seconds / total.moves if total.moves else 0.0,
+            'nodes_per_second': total.nodes / total.seconds if total.seconds else 0.0,
+        } for spec, total in zip(specs, totals)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('game', choices=GAMES)
+    parser.add_argument('players', nargs='+')
+    parser.add_argument('--games', type=int, default=10,
+                        help='games per pairing')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--opening-plies', type=int)
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--connect', type=int, default=4)
+    parser.add_argument('--json', action='store_true',
+                        help='print machine-readable results')
+    args = parser.parse_args()
+
+    report = run_tournament(
+        args.game, args.players, games=args.games, seed=args.seed,
+        workers=args.workers, opening_plies=args.opening_plies,
+        options={'rows': args.rows, 'cols': args.cols, 'connect': args.connect})
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for p in report['pairings']:
+        print(f"{p['a']} vs {p['b']}: +{p['a_wins']} ={p['draws']} "
+              f"-{p['b_wins']}  (Elo {p['elo_diff']:+.0f})")
+    print()
+    print(f'{"player":>24} {"elo":>6} {"ms/move":>8} {"nodes/s":>9}')
+    for p in sorted(report['players'], key=lambda p: -p['elo']):
+        print(f"{p['player']:>24} {p['elo']:>6.0f} {p['avg_move_ms']:>8.1f} "
+              f"{p['nodes_per_second']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Search Tracing
+Opt-in structured traces of AI decisions, kept in a bounded in-memory
+buffer to be fetched after the request. Code under trace takes a Trace and
+records nothing when handed None, so tracing costs one None check when off.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# What a trace records: the decision and each root move's score, or every
+# node the search visits as well
+LEVELS = ('summary', 'tree')
+
+# Events kept per trace; later events are counted but dropped
+MAX_EVENTS = 5000
+
+# Room kept for decision events once a tree trace's node events hit the cap
+DECISION_RESERVE = 100
+
+# Finished traces kept; the oldest is evicted first
+MAX_TRACES = 50
+
+
+class Trace:
+    """Events recorded while serving one request."""
+
+    __slots__ = ('id', 'name', 'level', 'events', 'dropped', 'limit',
+                 'start', 'elapsed')
+
+    def __init__(self, name: str, level: str = 'summary',
+                 limit: int = MAX_EVENTS):
+        if level not in LEVELS:
+            raise ValueError(f'Unknown trace level: {level}')
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.level = level
+        self.events: List[Dict] = []
+        self.dropped = 0
+        self.limit = limit
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+    @property
+    def tree(self) -> bool:
+        return self.level == 'tree'
+
+    def event(self, kind: str, **fields) -> None:
+        """Record a decision, such as a root move's score or the move chosen."""
+        if len(self.events) >= self.limit:
+            self.dropped += 1
+            return
+        self._append(kind, fields)
+
+    def node(self, kind: str, **fields) -> None:
+        """Record a step inside the search; these stop first when the trace fills."""
+        if len(self.events) >= self.limit - DECISION_RESERVE:
+            self.dropped += 1
+            return
+        self._append(kind, fields)
+
+    def _append(self, kind: str, fields: Dict) -> None:
+        fields['kind'] = kind
+        fields['ms'] = round(1000 * (time.perf_counter() - self.start), 3)
+        self.events.append(fields)
+
+    def finish(self) -> None:
+        self.elapsed = time.perf_counter() - self.start
+
+    def summary(self) -> Dict:
+        return {
+            'trace_id': self.id,
+            'name': self.name,
+            'level': self.level,
+            'events': len(self.events),
+            'dropped': self.dropped,
+            'elapsed_ms': None if self.elapsed is None else round(1000 * self.elapsed, 3),
+        }
+
+    def to_dict(self) -> Dict:
+        return dict(self.summary(), events=self.events)
+
+
+class TraceBuffer:
+    """Thread-safe store of the most recent finished traces."""
+
+    def __init__(self, capacity: int = MAX_TRACES):
+        self.capacity = capacity
+        self.traces: 'OrderedDict[str, Trace]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        if trace.elapsed is None:
+            trace.finish()
+        with self.lock:
+            self.traces[trace.id] = trace
+            while len(self.traces) > self.capacity:
+                self.traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self.lock:
+            return self.traces.get(trace_id)
+
+    def recent(self, name: Optional[str] = None) -> List[Dict]:
+        """Summaries of kept traces, newest first."""
+        with self.lock:
+            traces = list(self.traces.values())
+        return [trace.summary() for trace in reversed(traces)
+                if name is None or trace.name == name]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.traces.clear()
+
+
+def trace_level(value) -> Optional[str]:
+    """Read a request's trace option: true means 'summary', falsy means off."""
+    if not value:
+        return None
+    if value is True:
+        return 'summary'
+    if value not in LEVELS:
+        raise ValueError("trace must be true, 'summary' or 'tree'")
+    return value
+
+
+trace_buffer = TraceBuffer()